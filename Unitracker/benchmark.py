@@ -0,0 +1,491 @@
+# This Python file uses the following encoding: utf-8
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import datetime
+import platform
+import subprocess
+import tempfile
+import PySide6
+from PySide6.QtCore import QCoreApplication
+from PySide6.QtSql import QSqlDatabase, QSqlQuery
+from database import database
+
+
+# genres and platforms with how often they're picked relative to each other
+GENRES = {"Action": 10, "Adventure": 8, "RPG": 7, "Shooter": 6, "Strategy": 4, "Platformer": 4,
+          "Puzzle": 3, "Simulation": 3, "Racing": 2, "Horror": 2, "Sports": 2, "Fighting": 1, "Rhythm": 1}
+PLATFORMS = {"PC": 10, "PS5": 5, "Switch": 5, "PS4": 4, "Xbox Series": 3, "Xbox One": 2, "Mobile": 2, "PS3": 1, "Wii U": 1}
+# lengths of the series games are put in, picked uniformly; most games aren't in one
+SERIES_LENGTHS = [2, 2, 2, 3, 3, 4, 5, 6, 8, 12, 20, 40]
+SERIES_CHANCE = 0.3
+
+
+def pick(rng, weights, counts):
+    """
+    returns distinct names from weights, more common ones more often, as many as a random pick from counts
+    """
+    names = rng.choices(list(weights), list(weights.values()), k=rng.choice(counts))
+    return sorted(set(names))
+
+
+def random_date(rng, after=None):
+    start = after if after is not None else datetime.date(2005, 1, 1)
+    return (start + datetime.timedelta(days=rng.randint(0, 3650))).isoformat()
+
+
+def generate_records(num_games, seed=437):
+    """
+    yields (key, record) pairs like a json export for num_games randomly generated games:
+    each has 1-3 genres and 1-3 platforms (popular ones more often), about a third are in
+    a series of 2-40 games, and dates, hours and achievements are filled in for some of them
+    """
+    rng = random.Random(seed)
+    series = None
+    series_left = 0
+    num_series = 0
+    for i in range(num_games):
+        name = "Game " + str(i).zfill(7)
+        if (series_left == 0 and rng.random() < SERIES_CHANCE):
+            series = "Series " + str(num_series)
+            series_left = rng.choice(SERIES_LENGTHS)
+            num_series += 1
+        if (series_left > 0):
+            series_left -= 1
+        else:
+            series = None
+
+        progress = 100 if rng.random() < 0.25 else rng.randint(0, 99)
+        game = {"name": name, "progress": progress, "hours_played": round(rng.expovariate(1/30), 1), "series_name": series}
+        if (rng.random() < 0.7):
+            game["start_date"] = random_date(rng)
+            if (progress == 100):
+                game["end_date"] = random_date(rng, datetime.date.fromisoformat(game["start_date"]))
+        if (rng.random() < 0.6):
+            game["total_achievements"] = rng.randint(10, 80)
+            game["completed_achievements"] = game["total_achievements"]*progress//100
+        yield "games", game
+        for genre in pick(rng, GENRES, [1, 1, 2, 2, 2, 3]):
+            yield "genres", {"game_name": name, "name": genre}
+        for p in pick(rng, PLATFORMS, [1, 1, 1, 2, 2, 3]):
+            yield "platforms", {"game_name": name, "name": p}
+
+
+def create_library(num_games, seed=437):
+    """
+    creates a database handler on a temporary copy of the schema
+    and fills it with num_games randomly generated games, through the same path as an import
+    """
+    path = tempfile.mkdtemp(prefix="unitracker_bench_") + "/"
+    shutil.copy("./resources/createDB.sql", path)
+    db = database(path)
+    db.create_db()
+    db.replace_library(lambda: db.insert_records(generate_records(num_games, seed)))
+    return db, path
+
+
+def time_call(f, *args):
+    """
+    returns how long calling f(*args) took in milliseconds
+    """
+    start = time.perf_counter()
+    f(*args)
+    return (time.perf_counter() - start)*1000
+
+
+def bench_paging(db, depths, column=0):
+    """
+    times a single page turn at each of the given page depths,
+    with both OFFSET and keyset pagination, sorted by the given column;
+    the page cache is emptied before each timed turn, so the query itself is timed
+    """
+    results = {}
+    for keyset in (False, True):
+        db.set_keyset_paging(keyset)
+        db.sort_games(column)
+        times = {}
+        for depth in depths:
+            if (keyset):
+                # walk to the page before depth so the seek key is known,
+                # then time the page turn itself
+                while (db.get_current_page() < depth - 1):
+                    db.forward_page()
+                db.page_cache.clear()
+                times[depth] = time_call(db.forward_page)
+            else:
+                db.page_cache.clear()
+                times[depth] = time_call(db.get_games, depth)
+        results["keyset" if keyset else "offset"] = times
+    return results
+
+
+# the game listing query before genre/platform summaries were kept in game_tags
+LEGACY_LISTING = """
+SELECT game.name, progress, hours_played, start_date, end_date, total_achievements, completed_achievements, series_name,
+group_concat(DISTINCT genre.name) AS genre_name,
+group_concat(DISTINCT platform.name) AS platform_name
+FROM game LEFT JOIN genre ON (game.name == genre.game_name) LEFT JOIN platform ON (game.name == platform.game_name)
+GROUP BY game.name
+"""
+
+
+def bench_navigation(db, num_pages, num_checks=100000):
+    """
+    times turning forward num_pages pages from the first and checking has_next_page,
+    with the page cache emptied before each turn; returns ms per page turn and ms per check
+    """
+    db.set_keyset_paging(True)
+    db.sort_games(0)
+
+    def turn():
+        for i in range(num_pages):
+            db.page_cache.clear()
+            db.forward_page()
+
+    def check():
+        for i in range(num_checks):
+            db.has_next_page()
+
+    return {"forward_page": time_call(turn)/max(num_pages, 1), "has_next_page": time_call(check)/num_checks}
+
+
+def bench_page_cache(db, num_pages, num_visits=10):
+    """
+    times going back and forth over the first num_pages pages num_visits times, once with
+    the page cache (every page after the first visit comes from it) and once with it emptied
+    before every page like before it; returns ms per page for each
+    """
+    db.set_keyset_paging(True)
+    db.sort_games(0)
+
+    def visit(clear):
+        for i in range(num_visits):
+            db.get_games()
+            for p in range(num_pages):
+                if (clear):
+                    db.page_cache.clear()
+                db.forward_page()
+            for p in range(num_pages):
+                if (clear):
+                    db.page_cache.clear()
+                db.backward_page()
+
+    num_turns = num_visits*(2*num_pages + 1)
+    return {"cached": time_call(visit, False)/num_turns, "uncached": time_call(visit, True)/num_turns}
+
+
+def bench_writes(db, num_writes):
+    """
+    times adding, editing and deleting games one at a time, each its own transaction;
+    returns ms per add_item, edit_item and delete_item
+    """
+    names = ["Bench game " + str(i) for i in range(num_writes)]
+
+    def add():
+        for i in range(num_writes):
+            db.add_item({"name": names[i], "progress": 10, "hours_played": i, "series_name": "Series 1"}, ["RPG"], ["PC"])
+
+    def edit():
+        for i in range(num_writes):
+            db.edit_item(names[i], {"name": names[i], "progress": 50, "hours_played": i + 1, "series_name": "Series 2"}, ["RPG", "Action"], ["PC"])
+
+    def delete():
+        for name in names:
+            db.delete_item(name)
+
+    return {"add_item": time_call(add)/num_writes, "edit_item": time_call(edit)/num_writes,
+            "delete_item": time_call(delete)/num_writes}
+
+
+def bench_listing(db, depths):
+    """
+    times reading a page at each of the given page depths through the legacy
+    genre/platform join and through get_games
+    """
+    def legacy_page(page):
+        q = QSqlQuery()
+        q.exec(LEGACY_LISTING + " LIMIT " + str(db.items_per_page) + " OFFSET " + str(db.items_per_page*page))
+        while (q.next()):
+            pass
+
+    db.set_keyset_paging(False)
+    db.sort_games(0)
+    results = {"join": {}, "game_tags": {}}
+    for depth in depths:
+        results["join"][depth] = time_call(legacy_page, depth)
+        db.page_cache.clear()
+        results["game_tags"][depth] = time_call(db.get_games, depth)
+    db.set_keyset_paging(True)
+    return results
+
+
+# the library totals and per genre/platform/month counts before they were kept in the statistics tables
+LEGACY_STATS = [
+    "SELECT count(*), total(hours_played), avg(progress), total(progress >= 100), total(total_achievements), total(completed_achievements) FROM game",
+    "SELECT genre.name, count(*), total(hours_played) FROM genre LEFT JOIN game ON (game.name == genre.game_name) GROUP BY genre.name",
+    "SELECT platform.name, count(*), total(hours_played) FROM platform LEFT JOIN game ON (game.name == platform.game_name) GROUP BY platform.name",
+    "SELECT strftime('%Y-%m', end_date) AS month, count(*) FROM game WHERE month IS NOT NULL GROUP BY month"
+]
+
+
+def bench_stats(db):
+    """
+    times reading everything the stats menu shows, by scanning the game, genre and platform
+    tables like before the statistics tables and from the statistics tables
+    """
+    def scan():
+        q = QSqlQuery()
+        for sql in LEGACY_STATS:
+            q.exec(sql)
+            while (q.next()):
+                pass
+
+    def rollups():
+        db.get_stats()
+        db.get_genre_stats()
+        db.get_platform_stats()
+        db.get_monthly_stats()
+
+    return {"scan": time_call(scan), "rollups": time_call(rollups)}
+
+
+def bench_search(db, searches):
+    """
+    times the first page of each (text, column) search over the whole library
+    """
+    times = {}
+    for text, column in searches:
+        times[text] = time_call(db.search_games, text, column)
+    db.search_games("")
+    return times
+
+
+def bench_scrolling(db, column=0):
+    """
+    times scrolling a continuous game table down to the last game a chunk at a time;
+    returns (ms per chunk, chunks fetched, chunks still held in memory)
+    """
+    db.sort_games(column)
+    model = db.get_scrolling_games()
+    num_chunks = 0
+
+    def scroll():
+        nonlocal num_chunks
+        while (model.canFetchMore()):
+            model.fetchMore()
+            num_chunks += 1
+
+    elapsed = time_call(scroll)
+    return elapsed/max(num_chunks, 1), num_chunks, len(model.chunks)
+
+
+def bench_lookups(db, num_lookups):
+    """
+    times looking up games with get_game, with the statement cache and with a freshly
+    prepared query per lookup like before it; returns microseconds per lookup
+    """
+    names = ["Game " + str(i).zfill(7) for i in range(num_lookups)]
+
+    def uncached():
+        for name in names:
+            q = QSqlQuery()
+            q.prepare("SELECT * FROM game WHERE name=?")
+            q.bindValue(0, name)
+            q.exec()
+            q.next()
+            q.record()
+
+    def cached():
+        for name in names:
+            db.get_game(name)
+
+    return {"prepared": time_call(uncached)*1000/num_lookups, "cached": time_call(cached)*1000/num_lookups}
+
+
+def bench_import_export(db, path):
+    """
+    times exporting the library as sqlite, json and json lines and importing each back;
+    returns {format: (export ms, the database's import stats)}
+    """
+    results = {}
+    for extension in ("sqlite", "json", "jsonl"):
+        filename = path + "bench." + extension
+        export = db.export_db if extension == "sqlite" else db.export_json
+        importer = db.import_db if extension == "sqlite" else db.import_json
+        export_time = time_call(export, filename)
+        if (not importer(filename)):
+            return None
+        results[extension] = (export_time, db.import_stats)
+    return results
+
+
+def bench_storage(db, path, num_pages, num_writes):
+    """
+    times a json import, scrolling through num_pages pages and num_writes single-game
+    writes (each its own transaction) with each storage profile; returns {profile: {workload: s}}
+    """
+    filename = path + "bench_storage.json"
+    db.export_json(filename)
+    results = {}
+    for profile in db.STORAGE_PROFILES:
+        db.set_storage(db.STORAGE_PROFILES[profile])
+        times = {}
+        times["import"] = time_call(db.import_json, filename)/1000
+
+        def scroll():
+            db.get_games()
+            for i in range(num_pages):
+                db.forward_page()
+        times["scroll"] = time_call(scroll)/1000
+
+        def write():
+            for i in range(num_writes):
+                db.add_item({"name": "Bench write " + str(i), "hours_played": i})
+            db.delete_items(["Bench write " + str(i) for i in range(num_writes)])
+        times["writes"] = time_call(write)/1000
+        results[profile] = times
+    db.set_storage(db.STORAGE_PROFILES["safe"])
+    return results
+
+
+def flatten(results, prefix=""):
+    """
+    turns nested dicts of results into one dict of "a.b.c" names to numbers
+    """
+    flat = {}
+    for key, value in results.items():
+        name = prefix + str(key)
+        if (isinstance(value, dict)):
+            flat.update(flatten(value, name + "."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def run_suite(num_games, seed=437, log=print):
+    """
+    generates a library of num_games games and times every hot path on it;
+    returns a flat dict of timings in ms, named like "paging.name.keyset.100"
+    """
+    times = {}
+    log(f"Generating {num_games} games...")
+    start = time.perf_counter()
+    db, path = create_library(num_games, seed)
+    times["generate"] = (time.perf_counter() - start)*1000
+
+    last_page = (num_games - 1) // db.items_per_page
+    depths = sorted(set([1, last_page // 4, last_page // 2, last_page]))
+    depths = [d for d in depths if d > 0]
+
+    log("paging")
+    for column, title in [(0, "name"), (2, "hours_played")]:
+        times.update(flatten(bench_paging(db, depths, column), "paging." + title + "."))
+    times.update(flatten(bench_navigation(db, min(last_page, 1000)), "navigation."))
+    times.update(flatten(bench_page_cache(db, min(last_page, 20)), "page_cache."))
+
+    log("scrolling")
+    for column, title in [(0, "name"), (2, "hours_played")]:
+        per_chunk, num_chunks, kept = bench_scrolling(db, column)
+        times["scrolling." + title + ".chunk"] = per_chunk
+
+    log("listing")
+    times.update(flatten(bench_listing(db, depths), "listing."))
+
+    log("search")
+    searches = [("Game 00421", 0), ("Series 12", 7), ("RPG", 8), ("Switch", 9), ("2012", 3)]
+    times.update(flatten(bench_search(db, searches), "search."))
+
+    log("stats")
+    times.update(flatten(bench_stats(db), "stats."))
+
+    log("lookups")
+    lookups = bench_lookups(db, min(num_games, 10000))
+    times.update({"lookups." + k: v/1000 for k, v in lookups.items()})
+
+    log("writes")
+    times.update(flatten(bench_writes(db, 200), "writes."))
+
+    log("import/export")
+    results = bench_import_export(db, path)
+    if (results is not None):
+        for extension, (export_time, stats) in results.items():
+            times["transfer." + extension + ".export"] = export_time
+            times["transfer." + extension + ".import"] = stats["seconds"]*1000
+
+    log("storage profiles")
+    results = bench_storage(db, path, min(last_page, 1000), 200)
+    times.update({k: v*1000 for k, v in flatten(results, "storage.").items()})
+
+    db.close()
+    del db
+    shutil.rmtree(path)
+    return times
+
+
+def environment(seed):
+    """
+    describes what the benchmarks ran on, so results from different versions can be told apart
+    """
+    con = QSqlDatabase.addDatabase("QSQLITE", "version")
+    con.setDatabaseName(":memory:")
+    con.open()
+    q = QSqlQuery(con)
+    q.exec("SELECT sqlite_version()")
+    q.next()
+    sqlite = q.value(0)
+    del q
+    con.close()
+    del con
+    QSqlDatabase.removeDatabase("version")
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"date": datetime.datetime.now().isoformat(timespec="seconds"), "commit": commit, "seed": seed,
+            "python": platform.python_version(), "pyside": PySide6.__version__, "sqlite": sqlite,
+            "platform": platform.platform()}
+
+
+def compare(old, new):
+    """
+    prints every timing both result files have for the same library size, slowest change first
+    """
+    rows = []
+    for size, times in new["results"].items():
+        old_times = old["results"].get(size, {})
+        for name, ms in times.items():
+            if (name in old_times and old_times[name] > 0):
+                rows.append((ms/old_times[name], size, name, old_times[name], ms))
+    print(f"{'games':>8} {'timing':<40} {'old (ms)':>12} {'new (ms)':>12} {'change':>8}")
+    for ratio, size, name, old_ms, new_ms in sorted(rows, reverse=True):
+        print(f"{size:>8} {name:<40} {old_ms:>12.3f} {new_ms:>12.3f} {(ratio - 1)*100:>7.0f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="times Unitracker's hot paths on generated libraries")
+    parser.add_argument("sizes", nargs="*", type=int, default=[1000, 100000, 1000000],
+                        help="numbers of games to generate libraries of (default: 1000 100000 1000000)")
+    parser.add_argument("--seed", type=int, default=437)
+    parser.add_argument("--output", default="benchmark_results.json", help="json file to write the results to")
+    parser.add_argument("--compare", help="results from an earlier run to compare these with")
+    args = parser.parse_args()
+    app = QCoreApplication(sys.argv[:1])
+
+    results = {"environment": environment(args.seed), "results": {}}
+    for num_games in args.sizes:
+        times = run_suite(num_games, args.seed)
+        results["results"][str(num_games)] = times
+        for name, ms in times.items():
+            print(f"{name:<40} {ms:>12.3f} ms")
+        # written after every size, so a long run still leaves the sizes it finished
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+    print("results written to " + os.path.abspath(args.output))
+
+    if (args.compare is not None):
+        with open(args.compare) as f:
+            compare(json.load(f), results)
@@ -0,0 +1,183 @@
+# This Python file uses the following encoding: utf-8
+import os
+import sys
+import csv
+import json
+import argparse
+from PySide6.QtCore import QCoreApplication
+from database import database
+from config import ConfigStore
+
+
+def open_library(files_path, storage=None):
+    """
+    opens the database in files_path with the storage settings from its config.json,
+    or the given storage profile; returns None if it can't be opened
+    """
+    db = database(files_path)
+    if (not db.create_db()):
+        return None
+    if (storage is not None):
+        settings = db.STORAGE_PROFILES[storage]
+    else:
+        config = ConfigStore(files_path + "config.json").load()
+        settings = config.get("storage") if isinstance(config, dict) else None
+    if (settings is not None and not db.set_storage(settings)):
+        db.set_storage(db.STORAGE_PROFILES["safe"])
+    return db
+
+
+def show_progress(done, total):
+    """
+    progress callback for imports and exports, drawn on stderr when it's a terminal
+    """
+    if (sys.stderr.isatty()):
+        sys.stderr.write(f"\r{done}/{total} rows")
+        sys.stderr.flush()
+    return False
+
+
+def write_rows(out, names, rows, format):
+    """
+    writes each row as it comes, either as json lines keyed by names or as csv with names as the header
+    """
+    if (format == "csv"):
+        writer = csv.writer(out)
+        writer.writerow(names)
+        for row in rows:
+            writer.writerow(["" if v is None else v for v in row])
+    else:
+        for row in rows:
+            out.write(json.dumps(dict(zip(names, row))) + "\n")
+
+
+def run_import(db, args):
+    if (args.file.endswith(".sqlite")):
+        rv = db.import_db(args.file, show_progress)
+    else:
+        rv = db.import_json(args.file, show_progress)
+    if (sys.stderr.isatty()):
+        sys.stderr.write("\n")
+    if (rv):
+        stats = db.import_stats
+        print(f"imported {stats['rows']} rows in {stats['seconds']:.2f} s ({stats['rows_per_second']:.0f} rows/s)", file=sys.stderr)
+    return rv
+
+
+def run_export(db, args):
+    if (args.file.endswith(".sqlite")):
+        return bool(db.export_db(args.file))
+    rv = db.export_json(args.file, show_progress)
+    if (sys.stderr.isatty()):
+        sys.stderr.write("\n")
+    return rv
+
+
+def run_query(db, args, out):
+    if (args.search is not None):
+        db.search_games(args.search, db.SEARCH_COLUMNS.index(args.column))
+    db.sort_games(db.SEARCH_COLUMNS.index(args.sort), args.desc)
+    rows = db.iter_games()
+    if (args.limit is not None):
+        rows = (row for i, row in zip(range(args.limit), rows))
+    write_rows(out, db.SEARCH_COLUMNS, rows, args.format)
+    return True
+
+
+def run_stats(db, args, out):
+    stats = db.get_stats()
+    if (args.format == "csv"):
+        write_rows(out, ["stat", "value"], stats.items(), "csv")
+    else:
+        out.write(json.dumps(stats) + "\n")
+    return True
+
+
+def run_vacuum(db, args):
+    before = db.get_stats()["file_bytes"]
+    rv = db.vacuum()
+    if (rv):
+        print(f"{before} bytes -> {db.get_stats()['file_bytes']} bytes", file=sys.stderr)
+    return rv
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Unitracker without the GUI")
+    parser.add_argument("--data", default="./resources/",
+                        help="folder with UnitrackerGames.sqlite, createDB.sql and config.json (default: ./resources/)")
+    parser.add_argument("--storage", choices=["safe", "fast"],
+                        help="storage profile to use instead of the one in config.json")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("import", help="replace the library with a .sqlite, .json or .jsonl export")
+    p.add_argument("file")
+    p = commands.add_parser("export", help="export the library as .sqlite, .json or .jsonl")
+    p.add_argument("file")
+
+    sortable = ["name", "progress", "hours_played", "start_date", "end_date", "total_achievements", "completed_achievements", "series_name"]
+    searchable = sortable + ["genres", "platforms"]
+    p = commands.add_parser("query", help="list games, streamed as json lines or csv")
+    p.add_argument("--search", help="only games matching this text, like the search bar")
+    p.add_argument("--column", choices=searchable, default="name", help="column to search (default: name)")
+    p.add_argument("--sort", choices=sortable, default="name", help="column to sort by (default: name)")
+    p.add_argument("--desc", action="store_true", help="sort in descending order")
+    p.add_argument("--limit", type=int, help="stop after this many games")
+    p.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    p.add_argument("--output", help="file to write to instead of stdout")
+
+    p = commands.add_parser("stats", help="totals over the whole library")
+    p.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    p.add_argument("--output", help="file to write to instead of stdout")
+
+    commands.add_parser("vacuum", help="shrink the database file")
+    return parser
+
+
+def main(argv):
+    """
+    runs one command on the library and returns the exit status
+    """
+    args = make_parser().parse_args(argv)
+    files_path = os.path.join(args.data, "")
+    app = QCoreApplication(sys.argv[:1])
+
+    try:
+        db = open_library(files_path, args.storage)
+    except OSError as e:
+        # no such folder, or no createDB.sql in it
+        print("couldn't open the database in " + files_path + ": " + str(e), file=sys.stderr)
+        return 1
+    if (db is None):
+        print("couldn't open the database in " + files_path, file=sys.stderr)
+        return 1
+
+    if (args.command in ("query", "stats")):
+        out = sys.stdout if args.output is None else open(args.output, 'w', newline="")
+        try:
+            rv = run_query(db, args, out) if args.command == "query" else run_stats(db, args, out)
+        except BrokenPipeError:
+            # the reader stopped early (e.g. piped into head), so stop quietly
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            rv = True
+        except OSError:
+            rv = False
+        if (out is not sys.stdout):
+            out.close()
+    else:
+        commands = {"import": run_import, "export": run_export, "vacuum": run_vacuum}
+        try:
+            rv = commands[args.command](db, args)
+        except OSError:
+            rv = False
+
+    db.close()
+    del db
+    del app
+    if (not rv):
+        print(args.command + " failed", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
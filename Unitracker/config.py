@@ -0,0 +1,89 @@
+# This Python file uses the following encoding: utf-8
+import os
+import json
+from PySide6.QtCore import QObject, QTimer, QThreadPool
+
+
+class ConfigStore(QObject):
+    """
+    the app's config, kept in memory and saved to a json file; changes made close together
+    are saved in one write, which replaces the file atomically on a background thread
+    """
+    def __init__(self, filename, delay=500):
+        """
+        filename: json file the config is saved in
+        delay: milliseconds to wait for more changes before saving
+        """
+        QObject.__init__(self)
+        self.filename = filename
+        self.data = None
+        self.loaded = False
+        self.writes = 0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.write)
+        # one thread, so writes land in the order they were made
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+    def load(self):
+        """
+        returns the config, reading the file only the first time; None if there's no readable config
+        """
+        if (not self.loaded):
+            try:
+                with open(self.filename) as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError):
+                self.data = None
+            self.loaded = True
+        return self.data
+
+    def set(self, data):
+        """
+        replaces the whole config, saving it after the delay
+        """
+        self.data = data
+        self.loaded = True
+        self.save()
+
+    def save(self):
+        """
+        saves the config after the delay, restarting the delay if a save is already waiting
+        """
+        self.timer.start()
+
+    def write(self):
+        """
+        hands the config as it is now to the background thread to be written
+        """
+        self.timer.stop()
+        if (self.data is None):
+            return
+        text = json.dumps(self.data)
+        self.writes += 1
+        self.pool.start(lambda: self.write_file(text))
+
+    def write_file(self, text):
+        """
+        writes to a temporary file and renames it over the config file, so the
+        config file is always either the old config or the new one, never part of one
+        """
+        temp = self.filename + ".tmp"
+        try:
+            with open(temp, 'w') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp, self.filename)
+        except OSError:
+            pass
+
+    def flush(self):
+        """
+        saves a waiting change now and waits for every write to finish; called on shutdown
+        """
+        if (self.timer.isActive()):
+            self.write()
+        self.pool.waitForDone()
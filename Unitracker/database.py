@@ -1,20 +1,103 @@
 # This Python file uses the following encoding: utf-8
-from PySide6.QtSql import QSqlDatabase, QSqlQuery, QSqlQueryModel
-from PySide6.QtCore import Qt, QSortFilterProxyModel
+from PySide6.QtSql import QSqlDatabase
+from PySide6.QtCore import QSortFilterProxyModel
+from models import TableModel, GameTableModel, ScrollingGameModel
+from diagnostics import QueryTracer, TracedQuery
+from collections import OrderedDict
 import json
-import shutil
 import os
+import re
+import time
 
 
 class database:
-    def __init__(self, filepath="./"):
+    def __init__(self, filepath="./", connection=None):
+        """
+        connection: name for a connection of its own, for using the database from another thread;
+        by default the handler uses Qt's default connection
+        """
         self.files_path = filepath
         self.db_name = self.files_path + "UnitrackerGames.sqlite"
-        self.db = QSqlDatabase.addDatabase("QSQLITE")
+        self.connection = connection
+        if (connection is None):
+            self.db = QSqlDatabase.addDatabase("QSQLITE")
+        else:
+            self.db = QSqlDatabase.addDatabase("QSQLITE", connection)
         self.db.setDatabaseName(self.db_name)
         self.DEFAULT_IPP = 10
+        # bump whenever createDB.sql changes, or databases that are already
+        # up to date won't get the change (see create_db)
+        self.SCHEMA_VERSION = 6
+        self.GAME_COLUMNS = ["name", "progress", "hours_played", "start_date", "end_date", "total_achievements", "completed_achievements", "series_name"]
+        # missing progress and hours get the same defaults as in createDB.sql
+        self.INSERT_GAME = "INSERT INTO game (" + ", ".join(self.GAME_COLUMNS) + ") VALUES (?, ifnull(?, 0), ifnull(?, 0), ?, ?, ?, ?, ?)"
+        # imports keep missing values as they were exported, like .sqlite imports do
+        self.IMPORT_GAME = "INSERT INTO game (" + ", ".join(self.GAME_COLUMNS) + ") VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+        self.import_stats = None
+        # (key in json exports, table) for everything that gets exported and imported
+        self.EXPORT_TABLES = [("games", "game"), ("genres", "genre"), ("platforms", "platform"), ("series", "series")]
+        # columns of each table that imports bring in
+        self.IMPORT_COLUMNS = {
+            "game": self.GAME_COLUMNS,
+            "genre": ["game_name", "name"],
+            "platform": ["game_name", "name"],
+            "series": ["name", "num_games", "total_playtime"]
+        }
+        # tables imported rows go into; genres and platforms are imported by name into
+        # temp tables, then linked to their games through the dictionaries (see link_tags)
+        self.IMPORT_TARGETS = {"game": "game", "genre": "batch_genre", "platform": "batch_platform", "series": "series"}
+        # every query the handler runs is timed by the tracer (see query)
+        self.tracer = QueryTracer()
+        # prepared queries on the main connection, keyed by their sql, least recently used first
+        self.STATEMENT_CACHE_SIZE = 64
+        self.statements = OrderedDict()
+        self.statement_hits = 0
+        self.statement_misses = 0
+        # sqlite settings applied to the connection, from the storage section of config.json;
+        # "safe" is sqlite's defaults, "fast" trades some durability on power loss for speed
+        self.STORAGE_PROFILES = {
+            "safe": {"journal_mode": "DELETE", "synchronous": "FULL", "mmap_size": 0, "cache_size": -2000, "temp_store": "DEFAULT"},
+            "fast": {"journal_mode": "WAL", "synchronous": "NORMAL", "mmap_size": 268435456, "cache_size": -65536, "temp_store": "MEMORY"}
+        }
+        # allowed values of the storage settings that aren't numbers
+        self.STORAGE_CHOICES = {
+            "journal_mode": ["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"],
+            "synchronous": ["OFF", "NORMAL", "FULL", "EXTRA"],
+            "temp_store": ["DEFAULT", "FILE", "MEMORY"]
+        }
+        self.storage = dict(self.STORAGE_PROFILES["safe"])
+        # rows between progress callbacks while exporting
+        self.PROGRESS_INTERVAL = 1000
+        self.GAME_HEADERS = ["Name","Progress (%)", "Hours\nPlayed", "Start\nDate", "End\nDate", "Total\nAchievements", "Completed\nAchievements", "Series\nName", "Genre(s)", "Platform(s)"]
+        # game columns that can be searched, in the order get_games returns them
+        self.SEARCH_COLUMNS = ["name", "progress", "hours_played", "start_date", "end_date", "total_achievements", "completed_achievements", "series_name", "genres", "platforms"]
+        # sort expressions for the columns that can be sorted on, matching the indexes in createDB.sql;
+        # NULLs are replaced so keyset pagination can compare every row
+        self.SORT_KEYS = ["game.name", "ifnull(game.progress, -1)", "ifnull(game.hours_played, -1)",
+            "ifnull(game.start_date, '')", "ifnull(game.end_date, '')", "ifnull(game.total_achievements, -1)",
+            "ifnull(game.completed_achievements, -1)", "ifnull(game.series_name, '')"]
         self.items_per_page = self.DEFAULT_IPP
         self.current_page = 0
+        # keyset (seek) pagination: page_keys[p] is the name of the last game on page p,
+        # so the next page can seek past it instead of using OFFSET
+        self.keyset_paging = True
+        self.page_keys = []
+        # filled in by get_games from the same query as the page itself
+        self.next_page_exists = False
+        self.total_games = 0
+        # (text, column) the game pages are currently filtered by, or None
+        self.search_filter = None
+        # column the game pages are sorted by, numbered like the columns of get_games
+        self.sort_column = 0
+        self.sort_descending = False
+        # recently viewed pages as (rows, keys, total games, next page exists), least recently used
+        # first, keyed by everything that decides a page's contents; data_version goes up with
+        # every committed write, so pages from before it are never served again
+        self.PAGE_CACHE_SIZE = 32
+        self.page_cache = OrderedDict()
+        self.page_cache_hits = 0
+        self.page_cache_misses = 0
+        self.data_version = 0
 
         try:
             file = open(self.db_name, 'x')
@@ -22,24 +105,87 @@ class database:
         except FileExistsError:
             pass
 
+    def set_storage(self, settings):
+        """
+        applies storage settings (like the ones in self.STORAGE_PROFILES) to the connection,
+        returning False without changing anything if any of them isn't valid
+        """
+        pragmas = []
+        for name in self.STORAGE_PROFILES["safe"]:
+            value = settings.get(name, self.STORAGE_PROFILES["safe"][name])
+            if (name in self.STORAGE_CHOICES):
+                value = str(value).upper()
+                if (value not in self.STORAGE_CHOICES[name]):
+                    return False
+            else:
+                try:
+                    value = int(value)
+                except (TypeError, ValueError):
+                    return False
+            pragmas.append((name, value))
+
+        # the journal mode can't change while a statement still has rows open
+        self.finish_statements()
+        q = self.query()
+        for name, value in pragmas:
+            if (not q.exec("PRAGMA " + name + " = " + str(value))):
+                return False
+            self.storage[name] = value
+        q.finish()
+        return True
+
+    def get_storage(self):
+        """
+        returns the storage settings the connection is actually using, read back from sqlite
+        """
+        settings = {}
+        q = self.query()
+        for name in self.STORAGE_PROFILES["safe"]:
+            q.exec("PRAGMA " + name)
+            q.next()
+            value = q.value(0)
+            if (name in self.STORAGE_CHOICES and isinstance(value, int)):
+                # synchronous and temp_store are read back as their position in STORAGE_CHOICES
+                value = self.STORAGE_CHOICES[name][value]
+            settings[name] = value.upper() if isinstance(value, str) else value
+        q.finish()
+        return settings
+
+    def get_storage_profile(self):
+        """
+        returns the name of the profile the current storage settings match, or None if they're custom
+        """
+        for name, profile in self.STORAGE_PROFILES.items():
+            if (profile == self.storage):
+                return name
+        return None
+
     def set_items_per_page(self, ipp):
         """
         sets items per page as ipp
         """
         self.items_per_page = ipp if ipp > 0 else self.DEFAULT_IPP
+        self.page_keys = []
+
+    def set_keyset_paging(self, enabled):
+        """
+        switches between keyset (seek) pagination and LIMIT/OFFSET pagination
+        """
+        self.keyset_paging = enabled
+        self.page_keys = []
 
     def has_next_page(self):
         """
-        returns whether the game table has a page after the current one
+        returns whether the game table has a page after the current one;
+        this is known from the last get_games call, so no query is run
         """
-        next_page = QSqlQuery()
-        query = "SELECT * FROM game LIMIT " + str(self.items_per_page)
-        query += " OFFSET " + str(self.items_per_page*(self.current_page + 1))
-        next_page.prepare(query)
-        next_page.exec()
-        next_page.next()
+        return self.next_page_exists
 
-        return not next_page.record().isNull("name")
+    def get_page_count(self):
+        """
+        returns the total number of game pages, as of the last get_games call
+        """
+        return max(1, -(-self.total_games // self.items_per_page))
 
     def forward_page(self):
         """
@@ -74,6 +220,18 @@ class database:
         if not con.isOpen():
             con.open()
 
+        # a database that's already up to date has everything createDB.sql would create
+        if (self.get_schema_version(con) == self.SCHEMA_VERSION):
+            return True
+
+        if (not self.run_script(con)):
+            return False
+        return self.upgrade_db(con)
+
+    def run_script(self, con):
+        """
+        runs every statement in createDB.sql, which only creates what doesn't exist yet
+        """
         # load file
         f = open(self.files_path + "createDB.sql")
         cmds = []
@@ -82,16 +240,72 @@ class database:
             if not s.isspace():
                 cmds.append(s[:-2])
             s = f.readline()
+        f.close()
 
         # execute creation queries
         for i in cmds:
-            q = QSqlQuery(con)
+            q = self.query(con)
             q.prepare(i)
             if not q.exec():
                 return False
-        f.close()
         return True
 
+    def upgrade_db(self, con):
+        """
+        fills in anything a database made by an older version of Unitracker is missing,
+        using the user_version pragma to track what has already been done
+        """
+        version = self.get_schema_version(con)
+        if (version >= self.SCHEMA_VERSION):
+            return True
+
+        # version 5: integer keyed games, linked to genre and platform dictionaries; done first,
+        # since the steps below work on that layout (and it rebuilds what they do anyway)
+        if (version < 5 and not self.normalize_tags(con)):
+            return False
+
+        # version 2: genre/platform summary per game
+        if (version < 2 and not self.rebuild_game_tags(con)):
+            return False
+
+        # version 1: full text search index, which is built from the genre/platform summaries
+        if (version < 2 and not self.rebuild_search_index(con)):
+            return False
+
+        # version 3: series aggregates kept by triggers, starting from correct counts
+        if (version < 3 and not self.recompute_series(con)):
+            return False
+
+        # version 4: library statistics kept by triggers, starting from correct totals
+        if (version < 4 and not self.recompute_stats(con)):
+            return False
+
+        # version 6: end dates that aren't YYYY-MM-DD are counted under "Unknown" instead of dropped
+        if (version < 6 and not self.refresh_triggers(con)):
+            return False
+
+        q = self.query(con)
+        return q.exec("PRAGMA user_version = " + str(self.SCHEMA_VERSION))
+
+    def get_schema_version(self, con):
+        """
+        returns the schema version stored in the database, 0 for a new or unversioned one
+        """
+        q = self.query(con)
+        q.exec("PRAGMA user_version")
+        q.next()
+        version = q.value(0)
+        q.finish()
+        return version
+
+    def close(self):
+        """
+        closes the connection, after dropping every query on it; a named connection
+        can be removed with QSqlDatabase.removeDatabase once the handler is deleted
+        """
+        self.statements.clear()
+        self.db.close()
+
     def remove_db(self, con_name, db_name):
         """
         removes the given database and its file
@@ -103,281 +317,936 @@ class database:
         except FileNotFoundError:
             pass
 
-    def import_db(self, filename):
+    def rebuild_search_index(self, con=None, transaction=True):
         """
-        given a .sqlite filename, will check if it has the valid table and attribute setup
-        before overwriting the current database with it
+        rebuilds the full text search index from scratch; needed whenever the game
+        table is replaced (imports).
+        pass transaction=False to run it inside a transaction that's already open
         """
-        try:
-            file = open(filename, 'r')
-            file.close()
-            CONNECTION = "test_connection"
-            test_db = QSqlDatabase.addDatabase("QSQLITE", CONNECTION)
-            test_db.setDatabaseName(filename)
-            test_db.open()
-
-            # test that each table exists and has all the attributes
-            q_test = QSqlQuery(test_db)
-            q_test.prepare("SELECT name, progress, hours_played, start_date, end_date, total_achievements, completed_achievements, series_name FROM game")
-            if (not q_test.exec()):
-                test_db.close()
-                del test_db
-                QSqlDatabase.removeDatabase(CONNECTION)
-                return False
+        con = self.db if con is None else con
+        q = self.query(con)
+        if (transaction):
+            con.transaction()
+        rv = q.exec("DELETE FROM game_search")
+        rv = rv and q.exec("""
+        INSERT INTO game_search (rowid, name, series_name, genres, platforms)
+        SELECT game.id, game.name, series_name, genres, platforms
+        FROM game LEFT JOIN game_tags ON (game.id == game_tags.game_id)
+        """)
+        if (not transaction):
+            return rv
+        return self.finish_write(rv, con)
+
+    def recompute_series(self, con=None, transaction=True):
+        """
+        rebuilds every series' game count and total playtime from the game table;
+        the triggers in createDB.sql keep them up to date after that
+        """
+        con = self.db if con is None else con
+        q = self.query(con)
+        if (transaction):
+            con.transaction()
+        rv = q.exec("DELETE FROM series")
+        rv = rv and q.exec("""
+        INSERT INTO series (name, num_games, total_playtime)
+        SELECT series_name, count(*), total(hours_played) FROM game
+        WHERE series_name IS NOT NULL GROUP BY series_name
+        """)
+        if (not transaction):
+            return rv
+        return self.finish_write(rv, con)
+
+    def recompute_stats(self, con=None, transaction=True):
+        """
+        rebuilds the library statistics (totals, per genre, per platform and games finished
+        per month) from the game table and the genre and platform links; the triggers in createDB.sql
+        keep them up to date after that
+        """
+        con = self.db if con is None else con
+        q = self.query(con)
+        if (transaction):
+            con.transaction()
+        rv = True
+        for table in ["library_stats", "genre_stats", "platform_stats", "monthly_stats"]:
+            rv = rv and q.exec("DELETE FROM " + table)
+        rv = rv and q.exec("""
+        INSERT INTO library_stats (id, num_games, total_hours, total_progress, completed_games, total_achievements, completed_achievements)
+        SELECT 1, count(*), total(hours_played), ifnull(sum(ifnull(progress, 0)), 0), ifnull(sum(ifnull(progress, 0) >= 100), 0),
+        ifnull(sum(ifnull(total_achievements, 0)), 0), ifnull(sum(ifnull(completed_achievements, 0)), 0) FROM game
+        """)
+        for table in ["genre", "platform"]:
+            rv = rv and q.exec("INSERT INTO " + table + "_stats (name, num_games, total_hours) "
+                               "SELECT " + table + "_dict.name, count(*), total(game.hours_played) FROM game_" + table + " "
+                               "JOIN " + table + "_dict ON (" + table + "_dict.id == game_" + table + "." + table + "_id) "
+                               "LEFT JOIN game ON (game.id == game_" + table + ".game_id) GROUP BY " + table + "_dict.name")
+        rv = rv and q.exec("""
+        INSERT INTO monthly_stats (month, num_games)
+        SELECT CASE WHEN end_date <> '' THEN ifnull(strftime('%Y-%m', end_date), 'Unknown') END AS month,
+        count(*) FROM game WHERE month IS NOT NULL GROUP BY month
+        """)
+        if (not transaction):
+            return rv
+        return self.finish_write(rv, con)
+
+    def rebuild_game_tags(self, con=None, transaction=True):
+        """
+        rebuilds every game's genre/platform summary from scratch; they're normally
+        kept up to date by triggers on game_genre and game_platform (see createDB.sql)
+        """
+        con = self.db if con is None else con
+        q = self.query(con)
+        if (transaction):
+            con.transaction()
+        rv = q.exec("DELETE FROM game_tags")
+        rv = rv and q.exec("""
+        INSERT INTO game_tags (game_id, genres, platforms)
+        SELECT game.id,
+        (SELECT group_concat(name) FROM (SELECT genre_dict.name FROM game_genre JOIN genre_dict ON (genre_dict.id == game_genre.genre_id)
+        WHERE game_genre.game_id == game.id ORDER BY genre_dict.name)),
+        (SELECT group_concat(name) FROM (SELECT platform_dict.name FROM game_platform JOIN platform_dict ON (platform_dict.id == game_platform.platform_id)
+        WHERE game_platform.game_id == game.id ORDER BY platform_dict.name))
+        FROM game
+        """)
+        if (not transaction):
+            return rv
+        return self.finish_write(rv, con)
+
+    def index_game(self, name):
+        """
+        (re)indexes the game with the given name for full text search;
+        the index row's rowid is the game's id
+        """
+        q_obj = self.statement("DELETE FROM game_search WHERE rowid = (SELECT id FROM game WHERE name=?)")
+        q_obj.bindValue(0, name)
+        q_obj.exec()
 
-            if not (q_test.exec("SELECT game_name, name FROM genre")):
-                test_db.close()
-                del test_db
-                QSqlDatabase.removeDatabase(CONNECTION)
-                return False
+        q_obj = self.statement("""
+        INSERT INTO game_search (rowid, name, series_name, genres, platforms)
+        SELECT game.id, game.name, series_name, genres, platforms
+        FROM game LEFT JOIN game_tags ON (game.id == game_tags.game_id)
+        WHERE game.name=?
+        """)
+        q_obj.bindValue(0, name)
+        return q_obj.exec()
 
-            if not (q_test.exec("SELECT game_name, name FROM platform")):
-                test_db.close()
-                del test_db
-                QSqlDatabase.removeDatabase(CONNECTION)
-                return False
+    def import_db(self, filename, progress=None):
+        """
+        given a .sqlite filename, will check if it has the valid table and attribute setup
+        before replacing everything in the current database with its games, genres, platforms and series.
+        progress, if given, is called with (rows imported, total rows) after each table;
+        if it returns True the import is cancelled and nothing changes
+        """
+        if (not os.path.isfile(filename) or os.path.realpath(filename) == os.path.realpath(self.db_name)):
+            return False
 
-            if (not q_test.exec("SELECT name, num_games, total_playtime FROM series")):
-                test_db.close()
-                del test_db
-                QSqlDatabase.removeDatabase(CONNECTION)
-                return False
+        q = self.query()
+        q.prepare("ATTACH DATABASE ? AS imported")
+        q.addBindValue(filename)
+        if (not q.exec()):
+            return False
 
-            q_test.finish()
-            test_db.close()
-            del test_db
-            QSqlDatabase.removeDatabase(CONNECTION)
+        rv = self.check_schema(q, "imported")
+        rv = rv and self.replace_library(lambda: self.copy_tables(q, "imported", progress))
+        q.exec("DETACH DATABASE imported")
+        return rv
 
-            # overwrite the database
-            try:
-                shutil.copy(filename, self.db_name)
-            except shutil.SameFileError:
+    def check_schema(self, q, schema):
+        """
+        checks that the attached database schema has every table and column we import from it
+        """
+        for key, table in self.EXPORT_TABLES:
+            if (not q.exec("PRAGMA " + schema + ".table_info(" + table + ")")):
+                # not a database at all
                 return False
-            return True
-        except FileNotFoundError:
-            return False
+            columns = set()
+            while (q.next()):
+                columns.add(q.value(1))
+            if (not set(self.IMPORT_COLUMNS[table]) <= columns):
+                return False
+        return True
 
-    def import_json(self, filename):
+    def copy_tables(self, q, schema, progress=None):
         """
-        given a json file name, creates a temporary database, populates it,
-        then replaces the current database with it
+        copies every imported table from the attached database schema into ours;
+        returns how many rows were copied, or -1 if any copy failed or progress cancelled it
+        """
+        total = 0
+        if (progress is not None):
+            for key, table in self.EXPORT_TABLES:
+                q.exec("SELECT count(*) FROM " + schema + "." + table)
+                q.next()
+                total += q.value(0)
+
+        num_rows = 0
+        for key, table in self.EXPORT_TABLES:
+            columns = ", ".join(self.IMPORT_COLUMNS[table])
+            target = self.IMPORT_TARGETS[table]
+            if (not q.exec("INSERT INTO " + target + " (" + columns + ") SELECT " + columns + " FROM " + schema + "." + table)):
+                return -1
+            num_rows += q.numRowsAffected()
+            if (progress is not None and progress(num_rows, total)):
+                return -1
+        return num_rows
+
+    def import_json(self, filename, progress=None):
+        """
+        given a json file name, replaces the games, genres, platforms and series in the database
+        with the ones in the file. files ending in .jsonl are read as json lines, one row
+        at a time, like export_json writes them; anything else is read as one json document.
+        progress is called like in export_json; if it returns True the import is cancelled
+        and nothing changes
         """
         try:
-            with open(filename) as f:
-                to_import = json.load(f)
-
-            # create temp database for importing
-            CONNECTION = "temp_connection"
-            TEMP_NAME = "JSONImport"
-            temp_db = self.db.addDatabase("QSQLITE", CONNECTION)
-            temp_db.setDatabaseName(TEMP_NAME + ".sqlite")
-
-            # cleanup and return False if temp_db could not be created
-            if (not self.create_db(db=temp_db)):
-                temp_db.close()
-                del temp_db
-                self.remove_db(CONNECTION, TEMP_NAME)
-                return False
-            q = QSqlQuery(temp_db)
-
-            # import series
-            for i in range(len(to_import["series"])):
-                q.prepare("INSERT INTO series VALUES (?, ?, ?)")
-                q.bindValue(0, to_import["series"][i]["name"])
-                q.bindValue(1, int(to_import["series"][i]["num_games"]))
-                q.bindValue(2, float(to_import["series"][i]["total_playtime"]))
-                if (not q.exec()):
-                    temp_db.close()
-                    del temp_db
-                    self.remove_db(CONNECTION, TEMP_NAME)
-                    return False
+            f = open(filename)
+        except OSError:
+            return False
 
-            # import games
-            for i in range(len(to_import["games"])):
-                query = "INSERT INTO game ("
-                num_fields = len(to_import["games"][i])
-                # set up the query string
-                for v in to_import["games"][i]:
-                    query += v + ","
-
-                query = query [:len(query) - 1] + ")"
-                query += " VALUES ("
-                for j in range(num_fields):
-                    if (j != num_fields - 1):
-                        query += "?, "
-                    else:
-                        query += "?)"
-                q.prepare(query)
-
-                # bind values
-                for j, k in enumerate(to_import["games"][i]):
-                    q.bindValue(j, to_import["games"][i][k])
-
-                if (not q.exec()):
-                    temp_db.close()
-                    del temp_db
-                    self.remove_db(CONNECTION, TEMP_NAME)
+        with f:
+            total = 0
+            if (filename.endswith(".jsonl")):
+                if (progress is not None):
+                    total = sum(1 for line in f if not line.isspace())
+                    f.seek(0)
+                records = self.read_json_lines(f)
+            else:
+                try:
+                    to_import = json.load(f)
+                    total = sum(len(to_import[key]) for key, table in self.EXPORT_TABLES)
+                except (ValueError, KeyError, TypeError):
                     return False
+                records = ((key, r) for key, table in self.EXPORT_TABLES for r in to_import[key])
+            return self.replace_library(lambda: self.insert_records(records, progress, total))
 
-            # import genres
-            for i in range(len(to_import["genres"])):
-                q.prepare("INSERT INTO genre VALUES (?, ?)")
-                q.bindValue(0, to_import["genres"][i]["game_name"])
-                q.bindValue(1, to_import["genres"][i]["name"])
-                if (not q.exec()):
-                    temp_db.close()
-                    del temp_db
-                    self.remove_db(CONNECTION, TEMP_NAME)
-                    return False
+    def read_json_lines(self, f):
+        """
+        yields (key, record) for each line of a json lines export
+        """
+        for line in f:
+            if (line.strip()):
+                record = json.loads(line)
+                yield record.pop("table"), record
 
-            # import platforms
-            for i in range(len(to_import["platforms"])):
-                q.prepare("INSERT INTO platform VALUES (?, ?)")
-                q.bindValue(0, to_import["platforms"][i]["game_name"])
-                q.bindValue(1, to_import["platforms"][i]["name"])
-                if (not q.exec()):
-                    temp_db.close()
-                    del temp_db
-                    self.remove_db(CONNECTION, TEMP_NAME)
-                    return False
+    def replace_library(self, fill):
+        """
+        empties the database, then calls fill to put the imported rows in, which returns how many
+        rows it added or -1 on failure; everything happens in one transaction on the open
+        connection, so the database is either fully replaced or left as it was.
+        how many rows were imported and how fast is stored in self.import_stats
+        """
+        start = time.perf_counter()
+        self.finish_statements()
+        self.db.transaction()
+        num_rows = self.fill_library(fill)
+        if (not self.finish_write(num_rows >= 0)):
+            return False
 
-            # copy the database over
-            try:
-                dst = shutil.copy("JSONImport.sqlite", self.db_name)
-            except shutil.SameFileError:
-                temp_db.close()
-                del temp_db
-                self.remove_db(CONNECTION, TEMP_NAME)
-                return False
+        seconds = time.perf_counter() - start
+        self.import_stats = {"rows": num_rows, "seconds": seconds, "rows_per_second": num_rows/seconds if seconds > 0 else 0}
+        return True
 
-            # cleanup
-            temp_db.close()
-            del temp_db
-            self.remove_db(CONNECTION, TEMP_NAME)
+    def fill_library(self, fill):
+        """
+        empties the database and calls fill to put new rows in, for replace_library and normalize_tags;
+        runs inside a transaction that's already open and returns what fill returned, or -1 on failure
+        """
+        q = self.query()
+        # triggers would update the summaries row by row and indexes would be updated
+        # on every insert, so drop them and rebuild everything in one go once the rows are in
+        triggers = self.drop_schema(q, "trigger")
+        indexes = self.drop_schema(q, "index")
+        rv = triggers is not None and indexes is not None
+        for table in ["game_search", "game_tags", "game_genre", "game_platform", "genre_dict", "platform_dict", "game", "series"]:
+            rv = rv and q.exec("DELETE FROM " + table)
+        rv = rv and self.fill_tags("genre", []) and self.fill_tags("platform", [])
+
+        num_rows = 0
+        try:
+            num_rows = fill() if rv else -1
+        except (KeyError, TypeError, ValueError, AttributeError):
+            num_rows = -1
+        rv = num_rows >= 0
+
+        # the games are all in now, so their genres and platforms can be linked to them
+        rv = rv and self.link_tags("genre") and self.link_tags("platform")
+        for sql in (indexes if rv else []):
+            rv = rv and q.exec(sql)
+        rv = rv and self.rebuild_game_tags(transaction=False)
+        rv = rv and self.rebuild_search_index(transaction=False)
+        rv = rv and self.recompute_series(transaction=False)
+        rv = rv and self.recompute_stats(transaction=False)
+        for sql in (triggers if rv else []):
+            rv = rv and q.exec(sql)
+        return num_rows if rv else -1
+
+    def normalize_tags(self, con):
+        """
+        moves a database from before version 5, where genre and platform were tables of (game name, tag)
+        rows keyed on the game's name, to games with integer ids linked to genre and platform
+        dictionaries; genre and platform are views over the links after that, so reading them still works
+        """
+        q = self.query(con)
+        q.exec("SELECT type FROM sqlite_master WHERE name == 'genre'")
+        legacy = q.next() and q.value(0) == "table"
+        q.finish()
+        if (not legacy):
+            # made by createDB.sql, so it's already normalized
             return True
-        except FileNotFoundError:
+
+        self.finish_statements()
+        con.transaction()
+        # the old triggers and indexes would stay with the renamed tables and keep
+        # createDB.sql from making the new ones, since they share their names
+        rv = self.drop_schema(q, "trigger") is not None and self.drop_schema(q, "index") is not None
+        for table in ["game", "genre", "platform"]:
+            rv = rv and q.exec("ALTER TABLE " + table + " RENAME TO legacy_" + table)
+        rv = rv and q.exec("DROP TABLE game_tags")
+        rv = rv and self.run_script(con)
+        rv = rv and self.fill_library(lambda: self.copy_legacy(q)) >= 0
+        for table in ["game", "genre", "platform"]:
+            rv = rv and q.exec("DROP TABLE legacy_" + table)
+        if (not self.finish_write(rv, con)):
             return False
+        # give back the pages the old tables took up
+        return q.exec("VACUUM")
 
+    def refresh_triggers(self, con):
+        """
+        replaces the triggers with the ones in createDB.sql (which only creates the missing ones)
+        and rebuilds the statistics they keep, for when a trigger's definition changes
+        """
+        self.finish_statements()
+        q = self.query(con)
+        con.transaction()
+        rv = self.drop_schema(q, "trigger") is not None
+        rv = rv and self.run_script(con)
+        rv = rv and self.recompute_stats(con, False)
+        return self.finish_write(rv, con)
+
+    def copy_legacy(self, q):
+        """
+        copies the games, genres and platforms from the tables normalize_tags renamed, keeping
+        each game's rowid as its id; returns how many rows were copied, or -1 if any copy failed
+        """
+        columns = ", ".join(self.GAME_COLUMNS)
+        num_rows = 0
+        for sql in ["INSERT INTO game (id, " + columns + ") SELECT rowid, " + columns + " FROM legacy_game",
+                    "INSERT INTO batch_genre (game_name, name) SELECT game_name, name FROM legacy_genre",
+                    "INSERT INTO batch_platform (game_name, name) SELECT game_name, name FROM legacy_platform"]:
+            if (not q.exec(sql)):
+                return -1
+            num_rows += q.numRowsAffected()
+        return num_rows
+
+    def insert_records(self, records, progress=None, total=0):
+        """
+        inserts each (key, record) pair into its table, with one query per table prepared once;
+        returns how many rows were inserted, or -1 if any insert failed or progress cancelled it
+        """
+        queries = {}
+        for key, query in [("games", self.IMPORT_GAME),
+                           ("genres", "INSERT INTO batch_genre (game_name, name) VALUES (?, ?)"),
+                           ("platforms", "INSERT INTO batch_platform (game_name, name) VALUES (?, ?)"),
+                           ("series", "INSERT INTO series (name, num_games, total_playtime) VALUES (?, ?, ?)")]:
+            queries[key] = self.statement(query)
+
+        num_rows = 0
+        for key, record in records:
+            q = queries[key]
+            row = self.import_row(key, record)
+            for i in range(len(row)):
+                q.bindValue(i, row[i])
+            if (not q.exec()):
+                return -1
+            num_rows += 1
+            if (progress is not None and num_rows % self.PROGRESS_INTERVAL == 0 and progress(num_rows, total)):
+                return -1
+        if (progress is not None and progress(num_rows, total)):
+            return -1
+        return num_rows
+
+    def import_row(self, key, record):
+        """
+        turns a record from a json export into the values bound to its table's insert
+        """
+        if (key == "games"):
+            return tuple(record.get(c) for c in self.GAME_COLUMNS)
+        if (key == "series"):
+            return (record["name"], int(record["num_games"]), float(record["total_playtime"]))
+        return (record["game_name"], record["name"])
 
-    def export_db(self, filename):
-        return shutil.copy(self.db_name, filename)
+    def drop_schema(self, q, type):
+        """
+        drops every object of the given type ("trigger" or "index") that's defined in createDB.sql
+        and returns the list of statements that recreate them, or None if they couldn't be dropped
+        """
+        q.exec("SELECT name, sql FROM sqlite_master WHERE type = '" + type + "' AND sql IS NOT NULL")
+        objects = []
+        while (q.next()):
+            objects.append((q.value(0), q.value(1)))
+        q.finish()
+        for name, sql in objects:
+            if (not q.exec("DROP " + type.upper() + " " + name)):
+                return None
+        return [sql for name, sql in objects]
 
-    def export_json(self, filename):
+    def export_db(self, filename):
         """
-        exports the database as a json file
+        writes a copy of the database to filename, returning whether it succeeded; VACUUM INTO
+        reads everything in one transaction, so the copy is consistent even while another
+        connection writes (imports and exports run on their own), which copying the file isn't
         """
-        games = []
-        genres = []
-        platforms = []
-        series = []
-        q = QSqlQuery()
-        q.prepare("SELECT * FROM game")
-        if (not q.exec() or q.record().count() < 1):
+        if (os.path.realpath(filename) == os.path.realpath(self.db_name)):
             return False
-
-        # convert game records to list of dictionaries
-        while (q.next()):
-            game = q.record()
-            dict = {}
-            for i in range(game.count()):
-                f = game.field(i).name()
-                dict[f] = game.value(f)
-            games.append(dict)
-
-        q.prepare("SELECT * FROM genre")
-        if (not q.exec() or q.record().count() < 1):
-            print("genre select error")
+        # VACUUM INTO won't overwrite a file, so write next to it and replace it once done
+        temp = filename + ".tmp"
+        try:
+            if (os.path.exists(temp)):
+                os.remove(temp)
+        except OSError:
             return False
-
-        # convert genre records to list of dicts
-        while (q.next()):
-            genre = q.record()
-            dict = {}
-            for i in range(genre.count()):
-                f = genre.field(i).name()
-                dict[f] = genre.value(f)
-            genres.append(dict)
-
-        q.prepare("SELECT * FROM platform")
-        if (not q.exec() or q.record().count() < 1):
+        # like VACUUM, it can't run while any statement still has rows open
+        self.finish_statements()
+        q = self.query()
+        q.prepare("VACUUM INTO ?")
+        q.addBindValue(temp)
+        rv = q.exec()
+        q.finish()
+        try:
+            if (rv):
+                os.replace(temp, filename)
+            elif (os.path.exists(temp)):
+                os.remove(temp)
+        except OSError:
             return False
+        return rv
 
-        # convert platform records to list of dicts
-        while (q.next()):
-            platform = q.record()
-            dict = {}
-            for i in range(platform.count()):
-                f = platform.field(i).name()
-                dict[f] = platform.value(f)
-            platforms.append(dict)
-
-        q.prepare("SELECT * FROM series")
-        if (not q.exec() or q.record().count() < 1):
+    def export_json(self, filename, progress=None):
+        """
+        exports the database as a json file, writing one row at a time as it's read;
+        files ending in .jsonl get one row per line, tagged with the list it belongs to.
+        progress, if given, is called with (rows written, total rows) as the export goes;
+        if it returns True the export is cancelled and the unfinished file is deleted
+        """
+        lines = filename.endswith(".jsonl")
+        q = self.query()
+        total = 0
+        for key, table in self.EXPORT_TABLES:
+            if (not q.exec("SELECT count(*) FROM " + table) or not q.next()):
+                return False
+            total += q.value(0)
+
+        try:
+            fp = open(filename, 'w')
+        except OSError:
             return False
+        with fp:
+            rv = self.write_json(fp, lines, progress, total)
+        if (not rv):
+            os.remove(filename)
+        return rv
 
-        # convert series records to list of dicts
-        while (q.next()):
-            s = q.record()
-            dict = {}
-            for i in range(s.count()):
-                f = s.field(i).name()
-                dict[f] = s.value(f)
-            series.append(dict)
-
-        # saves (exports) the database converted to json
-        to_export = {"games": games, "genres": genres, "platforms": platforms, "series": series}
-        with open(filename, 'w') as fp:
-            json.dump(to_export, fp)
-        return True
+    def write_json(self, fp, lines, progress, total):
+        """
+        writes every exported table to fp for export_json, returning False if a table
+        couldn't be read or progress cancelled the export
+        """
+        written = 0
+        if (not lines):
+            fp.write("{")
+        for key, table in self.EXPORT_TABLES:
+            # forward only, so rows aren't kept around once they've been read
+            q = self.query()
+            q.setForwardOnly(True)
+            # the same columns as imports read, so exports don't carry the game ids
+            if (not q.exec("SELECT " + ", ".join(self.IMPORT_COLUMNS[table]) + " FROM " + table)):
+                return False
+            fields = [q.record().fieldName(i) for i in range(q.record().count())]
+
+            if (not lines):
+                fp.write(("" if key == self.EXPORT_TABLES[0][0] else ", ") + json.dumps(key) + ": [")
+            while (q.next()):
+                # PySide hands back NULLs as empty strings
+                row = {f: None if q.isNull(i) else q.value(i) for i, f in enumerate(fields)}
+                if (lines):
+                    fp.write(json.dumps({"table": key, **row}) + "\n")
+                else:
+                    fp.write((", " if q.at() > 0 else "") + json.dumps(row))
+                written += 1
+                if (progress is not None and written % self.PROGRESS_INTERVAL == 0 and progress(written, total)):
+                    return False
+            if (not lines):
+                fp.write("]")
+        if (not lines):
+            fp.write("}")
+
+        return progress is None or not progress(written, total)
 
     def get_games(self, page=0):
         """
-        return a QSortFilterProxyModel with a QSqlQueryModel as its source model,
-        which contains all the game records joined with genre and platform records;
-        supports pagination: 1 page = self.items_per_page records
+        return a GameTableModel which contains the game records joined with their genre and platform summaries,
+        in the order set by sort_games and filtered by search_games;
+        supports pagination: 1 page = self.items_per_page records, using keyset
+        pagination when the previous page's last key is known.
+        one extra row and the total game count are fetched in the same query,
+        so has_next_page and get_page_count don't need their own queries
+        """
+        if (page == 0):
+            self.current_page = 0
+            self.page_keys = []
+
+        cache_key = self.page_cache_key(page)
+        cached = self.page_cache.get(cache_key)
+        if (cached is not None):
+            # seen since the last write, so no query is needed
+            self.page_cache_hits += 1
+            self.page_cache.move_to_end(cache_key)
+            rows, keys, self.total_games, self.next_page_exists = cached
+        else:
+            self.page_cache_misses += 1
+            fetched = self.fetch_page(page)
+            if (fetched is None):
+                # show an empty page, but don't keep it, so the page is read again next time
+                rows, keys = [], []
+            else:
+                rows, keys = fetched
+                self.cache_page(cache_key, (tuple(rows), tuple(keys), self.total_games, self.next_page_exists))
+
+        # remember the last key of this page for seeking to the next one
+        if (self.keyset_paging):
+            del self.page_keys[page:]
+            if (len(rows) > 0 and len(self.page_keys) == page):
+                self.page_keys.append(keys[-1])
+
+        # the model changes its lists as games are edited, so it gets its own
+        return GameTableModel(self, self.GAME_HEADERS, list(rows), list(keys))
+
+    def fetch_page(self, page):
+        """
+        runs the query for a page of get_games, setting total_games and next_page_exists;
+        returns the page's rows and their sort keys, or None (changing nothing) if the query failed
+        """
+        conditions = []
+        params = []
+        offset = 0
+        if (self.keyset_paging and page > 0 and len(self.page_keys) >= page):
+            # seek past the last game of the previous page, so the cost of a page
+            # doesn't grow with how deep into the table it is
+            condition, params = self.seek_condition(self.page_keys[page - 1])
+            conditions.append(condition)
+        else:
+            # no known key for the previous page, so fall back to LIMIT and OFFSET
+            offset = self.items_per_page*page
+
+        result = self.query_games(conditions, params, self.items_per_page + 1, offset, True)
+        if (result is None):
+            return None
+        rows, keys, self.total_games = result
+
+        # the extra row only tells us whether there's a next page
+        self.next_page_exists = len(rows) > self.items_per_page
+        rows = rows[:self.items_per_page]
+        keys = keys[:self.items_per_page]
+        if (len(rows) == 0):
+            self.total_games = self.items_per_page*page
+        return rows, keys
+
+    def page_cache_key(self, page, page_keys=None):
+        """
+        returns the page cache's key for a page, given the current order, search and data version;
+        with keyset pagination a page holds the games after the previous page's last key (from page_keys,
+        self.page_keys by default), which moves when games are added or deleted before it, so that key
+        is part of it, otherwise the page's offset is
+        """
+        page_keys = self.page_keys if page_keys is None else page_keys
+        if (self.keyset_paging and page > 0 and len(page_keys) >= page):
+            start = page_keys[page - 1]
+        else:
+            start = self.items_per_page*page
+        return (page, start, self.items_per_page, self.sort_column, self.sort_descending, self.search_filter, self.data_version)
+
+    def cache_page(self, key, entry):
+        self.page_cache[key] = entry
+        self.page_cache.move_to_end(key)
+        if (len(self.page_cache) > self.PAGE_CACHE_SIZE):
+            self.page_cache.popitem(last=False)
+
+    def get_page_state(self):
+        """
+        returns what decides the game pages' contents, for another handler to fetch them with (see prefetch_pages)
+        """
+        return {"items_per_page": self.items_per_page, "sort_column": self.sort_column,
+                "sort_descending": self.sort_descending, "search_filter": self.search_filter,
+                "keyset_paging": self.keyset_paging, "page_keys": list(self.page_keys),
+                "current_page": self.current_page, "data_version": self.data_version}
+
+    def pages_to_prefetch(self, depth):
+        """
+        returns lists of the pages after and before the current one, up to depth of each,
+        that aren't in the page cache yet
+        """
+        forward = []
+        if (self.next_page_exists):
+            forward = [p for p in range(self.current_page + 1, self.current_page + depth + 1)]
+        backward = [p for p in range(self.current_page - 1, max(self.current_page - depth, 0) - 1, -1)]
+        # a forward page's cache key depends on where the page before it ends, which is only
+        # known from the cache, so the pages are only skipped if every one of them is cached
+        page_keys = list(self.page_keys)
+        for page in forward:
+            entry = self.page_cache.get(self.page_cache_key(page, page_keys))
+            if (entry is None):
+                break
+            if (self.keyset_paging and len(page_keys) == page and len(entry[1]) > 0):
+                page_keys.append(entry[1][-1])
+        else:
+            forward = []
+        backward = [p for p in backward if self.page_cache_key(p) not in self.page_cache]
+        return forward, backward
+
+    def prefetch_pages(self, state, forward, backward):
+        """
+        fetches pages with another handler's page state (see get_page_state): forward is a list of
+        consecutive pages after its current one and backward a list of pages before it;
+        returns a list of (page cache key, page cache entry) for the other handler's store_pages
+        """
+        for name, value in state.items():
+            setattr(self, name, value)
+        results = []
+        for page in forward:
+            fetched = self.fetch_page(page)
+            if (fetched is None or len(fetched[0]) == 0):
+                break
+            rows, keys = fetched
+            results.append((self.page_cache_key(page), (tuple(rows), tuple(keys), self.total_games, self.next_page_exists)))
+            # lets the next page seek past this one
+            if (self.keyset_paging and len(self.page_keys) == page):
+                self.page_keys.append(keys[-1])
+            if (not self.next_page_exists):
+                break
+        for page in backward:
+            # a page before the current one can only be empty if the games changed, so it isn't kept
+            fetched = self.fetch_page(page)
+            if (fetched is None or len(fetched[0]) == 0):
+                continue
+            rows, keys = fetched
+            results.append((self.page_cache_key(page), (tuple(rows), tuple(keys), self.total_games, self.next_page_exists)))
+        return results
+
+    def store_pages(self, results):
+        """
+        puts pages fetched by prefetch_pages in the page cache, unless the games changed since or
+        the page was read from a key that's no longer where the page before it ends
+        """
+        page_keys = list(self.page_keys)
+        for key, entry in results:
+            page = key[0]
+            if (key != self.page_cache_key(page, page_keys)):
+                continue
+            self.cache_page(key, entry)
+            # lets the next forward page be checked against where this one ends
+            if (self.keyset_paging and len(page_keys) == page and len(entry[1]) > 0):
+                page_keys.append(entry[1][-1])
+
+    def get_page_cache_stats(self):
+        """
+        returns the page cache's size, hits and misses
+        """
+        return {"size": len(self.page_cache), "hits": self.page_cache_hits, "misses": self.page_cache_misses}
+
+    def bump_data_version(self):
+        """
+        marks every cached page as out of date; called after each committed write, and by
+        whoever changes the database through another connection
+        """
+        self.data_version += 1
+        self.page_cache.clear()
+
+    def get_scrolling_games(self):
+        """
+        return a ScrollingGameModel over every game in the order set by sort_games and
+        filtered by search_games, fetched in chunks as the view scrolls instead of by page
+        """
+        return ScrollingGameModel(self, self.GAME_HEADERS)
+
+    def count_games(self):
         """
-        headers = ["Name","Progress (%)", "Hours\nPlayed", "Start\nDate", "End\nDate", "Total\nAchievements", "Completed\nAchievements", "Series\nName", "Genre(s)", "Platform(s)"]
-        model = QSqlQueryModel()
+        returns how many games match the current search
+        """
+        result = self.query_games([], [], 1, 0, True)
+        if (result is None or len(result[0]) == 0):
+            return 0
+        return result[2]
+
+    def get_game_row(self, name):
+        """
+        returns the row get_games would show for the given game and its sort key,
+        or None if there's no such game or it doesn't match the current search
+        """
+        result = self.query_games(["game.name = ?"], [name], 1)
+        if (result is None or len(result[0]) == 0):
+            return None
+        return result[0][0], result[1][0]
+
+    def get_games_after(self, key, limit):
+        """
+        returns lists of up to limit rows and their sort keys for the games
+        that come after the given sort key (or from the start, if key is None); both are empty
+        if the query failed
+        """
+        if (key is None):
+            result = self.query_games([], [], limit)
+        else:
+            condition, params = self.seek_condition(key)
+            result = self.query_games([condition], params, limit)
+        if (result is None):
+            return [], []
+        return result[0], result[1]
+
+    def iter_games(self, chunk_size=1000):
+        """
+        yields every game row get_games would show, in the current order and search, reading
+        chunk_size rows at a time so the whole listing is never in memory; missing values are None.
+        raises OSError if a chunk couldn't be read, rather than ending the listing early
+        """
+        conditions = []
+        params = []
+        while (True):
+            result = self.query_games(conditions, params, chunk_size, nulls=True)
+            if (result is None):
+                raise OSError("couldn't read the games from the database")
+            rows, keys, total = result
+            yield from rows
+            if (len(rows) < chunk_size):
+                return
+            condition, params = self.seek_condition(keys[-1])
+            conditions = [condition]
+
+    def seek_condition(self, key):
+        """
+        returns a WHERE condition on game for the games after the given sort key
+        in the current order, and the values to bind to it
+        """
+        sort_key = self.SORT_KEYS[self.sort_column]
+        comparison = " < " if self.sort_descending else " > "
+        last_value, last_name = key
+        if (self.sort_column == 0):
+            return "game.name" + comparison + "?", [last_name]
+        # written so SQLite can range-search the sort column's index
+        condition = sort_key + comparison.strip() + "= ? AND (" + sort_key + comparison + "? OR game.name" + comparison + "?)"
+        return condition, [last_value, last_value, last_name]
+
+    def query_games(self, conditions, params, limit, offset=0, count=False, nulls=False):
+        """
+        runs the game listing for the games matching the current search and the given
+        conditions, in the current sort order; returns the list of rows, the list of
+        their sort keys, and (if count is True) how many games match the search, or None if
+        the query failed (e.g. the database was locked for too long).
+        missing values come back as '' like Qt gives them, or as None if nulls is True
+        """
+        # filter by the current search, if there is one
+        conditions = list(conditions)
+        params = list(params)
+        count_query = "(SELECT count(*) FROM game)"
+        if (self.search_filter is not None):
+            condition, count_query, value = self.search_condition()
+            conditions.insert(0, condition)
+            params.insert(0, value)
+            # the count subquery's parameter comes first, since it's in the select list
+            if (count):
+                params.insert(0, value)
+        if (not count):
+            count_query = "NULL"
+
+        # games are ordered by the sort column, then by name to break ties
+        sort_key = self.SORT_KEYS[self.sort_column]
+        direction = " DESC" if self.sort_descending else ""
+        order = " ORDER BY " + sort_key + direction
+        if (self.sort_column != 0):
+            order += ", game.name" + direction
+
+        # pick the page's games first, then join their genre/platform summaries (one row per game)
+        page_query = "SELECT * FROM game"
+        if (len(conditions) > 0):
+            page_query += " WHERE " + " AND ".join(conditions)
+        # the limit and offset are bound too, so every page of a listing shares one statement
+        page_query += order + " LIMIT ? OFFSET ?"
+        params += [limit, offset]
+
         query = """
         SELECT game.name, progress, hours_played, start_date, end_date, total_achievements, completed_achievements, series_name,
-        group_concat(DISTINCT genre.name) AS genre_name,
-        group_concat(DISTINCT platform.name) AS platform_name
-        FROM game LEFT JOIN genre ON (game.name == genre.game_name) LEFT JOIN platform ON (game.name == platform.game_name)
-        GROUP BY game.name
+        genres, platforms,
+        """ + count_query + """ AS total_games,
+        """ + sort_key + """ AS sort_key
+        FROM (""" + page_query + """) AS game
+        LEFT JOIN game_tags ON (game.id == game_tags.game_id)
+        """ + order
+
+        q = self.statement(query)
+        for p in params:
+            q.addBindValue(p)
+        if (not q.exec()):
+            q.finish()
+            return None
+
+        num_columns = len(self.GAME_HEADERS)
+        rows = []
+        keys = []
+        total = 0
+        while (q.next()):
+            if (nulls):
+                rows.append(tuple(None if q.isNull(i) else q.value(i) for i in range(num_columns)))
+            else:
+                rows.append(tuple(q.value(i) for i in range(num_columns)))
+            keys.append((q.value(num_columns + 1), q.value(0)))
+            total = q.value(num_columns)
+        # reading the rows can fail partway too
+        failed = q.lastError().isValid()
+        q.finish()
+        if (failed):
+            return None
+        return rows, keys, total
+
+    def sort_games(self, column, descending=False):
         """
-        # handles pages by using LIMIT and OFFSET clauses
-        if (page == 0):
-            self.current_page = 0
-        offset = self.items_per_page*page
-        query = query + " LIMIT " + str(self.items_per_page)
-        if (offset > 0):
-            query = query + " OFFSET " + str(offset)
-        model.setQuery(query)
+        sorts the whole game table by the given column (numbered like the columns of get_games)
+        and returns the first page, or returns None if the column can't be sorted on
+        """
+        if (column < 0 or column >= len(self.SORT_KEYS)):
+            return None
+        self.sort_column = column
+        self.sort_descending = descending
+        return self.get_games()
 
-        for i in range(len(headers)):
-            model.setHeaderData(i, Qt.Horizontal, headers[i])
+    def search_condition(self):
+        """
+        returns a WHERE condition on game for the current search filter,
+        a subquery counting its matches, and the value to bind to both;
+        name, series, genre and platform searches go through the full text index,
+        other columns are matched as text
+        """
+        text, column = self.search_filter
+        column_name = self.SEARCH_COLUMNS[column]
+        if (column_name in ("name", "series_name", "genres", "platforms")):
+            # match every word of the search as a prefix within the chosen column
+            words = re.findall(r"\w+", text)
+            match = "{" + column_name + "} : (" + " ".join('"' + w + '"*' for w in words) + ")"
+            condition = "game.id IN (SELECT rowid FROM game_search WHERE game_search MATCH ?)"
+            count_query = "(SELECT count(*) FROM game_search WHERE game_search MATCH ?)"
+            return condition, count_query, match
+        condition = "CAST(game." + column_name + " AS TEXT) LIKE ?"
+        count_query = "(SELECT count(*) FROM game WHERE " + condition + ")"
+        return condition, count_query, "%" + text + "%"
+
+    def search_games(self, text, column=0):
+        """
+        filters the game pages to games matching text in the given column
+        (numbered like the columns of get_games) and returns the first page;
+        an empty search removes the filter
+        """
+        if (len(re.findall(r"\w+", text)) == 0):
+            self.search_filter = None
+        else:
+            self.search_filter = (text, column)
+        return self.get_games()
+
+    def get_stats(self):
+        """
+        returns a dict of totals over the whole library, and the size of the database file in bytes;
+        the totals come from the statistics tables the triggers in createDB.sql keep up to date,
+        so this takes the same time however many games there are
+        """
+        q = self.query()
+        q.exec("""
+        SELECT num_games, total_hours, total_progress, completed_games, total_achievements, completed_achievements,
+        (SELECT count(*) FROM series), (SELECT count(*) FROM genre_stats), (SELECT count(*) FROM platform_stats)
+        FROM library_stats WHERE id == 1
+        """)
+        # there's no totals row until the first game is added
+        row = [q.value(i) for i in range(9)] if q.next() else [0]*9
+        games, hours, progress, completed, achievements, completed_achievements = row[:6]
+        stats = {"games": games, "series": row[6], "genres": row[7], "platforms": row[8],
+                 "hours_played": float(hours), "average_progress": progress/games if games > 0 else 0,
+                 "completed_games": completed, "completion_rate": completed/games if games > 0 else 0,
+                 "total_achievements": achievements, "completed_achievements": completed_achievements,
+                 "achievement_ratio": completed_achievements/achievements if achievements > 0 else 0}
+        q.exec("PRAGMA page_count")
+        q.next()
+        pages = q.value(0)
+        q.exec("PRAGMA page_size")
+        q.next()
+        stats["file_bytes"] = pages*q.value(0)
+        q.finish()
+        return stats
+
+    def get_genre_stats(self):
+        """
+        return a QSortFilterProxyModel over how many games have each genre and their total hours,
+        most common first
+        """
+        return self.stats_model(["Genre", "Games", "Hours\nPlayed"],
+                                "SELECT name, num_games, total_hours FROM genre_stats ORDER BY num_games DESC, name")
+
+    def get_platform_stats(self):
+        """
+        return a QSortFilterProxyModel over how many games are on each platform and their total hours,
+        most common first
+        """
+        return self.stats_model(["Platform", "Games", "Hours\nPlayed"],
+                                "SELECT name, num_games, total_hours FROM platform_stats ORDER BY num_games DESC, name")
+
+    def get_monthly_stats(self):
+        """
+        return a QSortFilterProxyModel over how many games were finished (have an end date) each month,
+        latest first; end dates that aren't YYYY-MM-DD are counted under "Unknown"
+        """
+        return self.stats_model(["Month", "Games\nFinished"], "SELECT month, num_games FROM monthly_stats ORDER BY month DESC")
 
-        # proxy model handles sorting and filtering
+    def stats_model(self, headers, sql):
+        q = self.query()
+        q.exec(sql)
+        rows = []
+        while (q.next()):
+            rows.append(tuple(q.value(i) for i in range(len(headers))))
         proxy = QSortFilterProxyModel()
-        proxy.setSourceModel(model)
+        proxy.setSourceModel(TableModel(headers, rows))
         return proxy
 
+    def vacuum(self):
+        """
+        rebuilds the database file without its free pages, returning whether it succeeded
+        """
+        # VACUUM can't run while any statement still has rows open
+        self.finish_statements()
+        q = self.query()
+        return q.exec("VACUUM")
+
     def get_series(self):
         """
-        return a QSortFilterProxyModel with a QSqlQueryModel as its source model,
+        return a QSortFilterProxyModel with a TableModel as its source model,
         which contains all the series records
         """
         headers = ["Name", "Number of\nGames", "Total Hours\nPlayed"]
-        model = QSqlQueryModel()
-        model.setQuery("SELECT * FROM series")
-
-        for i in range(len(headers)):
-            model.setHeaderData(i, Qt.Horizontal, headers[i])
+        q = self.query()
+        q.exec("SELECT name, num_games, total_playtime FROM series")
+        rows = []
+        while (q.next()):
+            rows.append((q.value(0), q.value(1), q.value(2)))
+        model = TableModel(headers, rows)
 
         proxy = QSortFilterProxyModel()
         proxy.setSourceModel(model)
         return proxy
 
+    def get_series_row(self, name):
+        """
+        returns the row get_series would show for the given series, or None if it doesn't exist
+        """
+        q = self.statement("SELECT name, num_games, total_playtime FROM series WHERE name=?")
+        q.bindValue(0, name)
+        q.exec()
+        row = (q.value(0), q.value(1), q.value(2)) if q.next() else None
+        q.finish()
+        return row
+
     def add_item(self, item, genres=None, platforms=None):
         """
         item: dict of values to make a game item from; adds said item to the db
@@ -385,69 +1254,133 @@ class database:
         genres: list of genres to add for a game
         platforms: list of platforms to add for a game
         """
+        return self.add_items([(item, genres, platforms)])
 
-        # construct the query string
-        query = "INSERT INTO game ("
-        for v in item:
-            query += v + ", "
+    def add_items(self, records):
+        """
+        records: list of (item, genres, platforms) tuples, each like the arguments of add_item;
+        adds all the games in one transaction, returning whether it succeeded
+        """
+        games = []
+        genre_rows = []
+        platform_rows = []
+        for item, genres, platforms in records:
+            games.append(tuple(item.get(c) for c in self.GAME_COLUMNS))
+            genre_rows += [(item["name"], g) for g in (genres if genres is not None else [])]
+            platform_rows += [(item["name"], p) for p in (platforms if platforms is not None else [])]
+
+        self.db.transaction()
+        rv = self.fill_batch([g[0] for g in games])
+
+        # add the actual games, then their genres and platforms
+        rv = rv and self.exec_rows(self.INSERT_GAME, games)
+        rv = rv and self.fill_tags("genre", genre_rows) and self.link_tags("genre")
+        rv = rv and self.fill_tags("platform", platform_rows) and self.link_tags("platform")
+
+        # index the new games for searching
+        rv = rv and self.statement("""
+        INSERT INTO game_search (rowid, name, series_name, genres, platforms)
+        SELECT game.id, game.name, series_name, genres, platforms
+        FROM game LEFT JOIN game_tags ON (game.id == game_tags.game_id)
+        WHERE game.name IN (SELECT name FROM batch_games)
+        """).exec()
+        return self.finish_write(rv)
+
+    def fill_batch(self, names):
+        """
+        puts the given game names in the batch_games temp table, for set-based writes
+        """
+        q_obj = self.query()
+        q_obj.exec("CREATE TEMP TABLE IF NOT EXISTS batch_games(name VARCHAR(25), PRIMARY KEY(name))")
+        q_obj.exec("DELETE FROM batch_games")
+        return self.exec_rows("INSERT OR IGNORE INTO batch_games (name) VALUES (?)", [(n,) for n in names])
 
-        query = query [:len(query) - 2] + ")"
-        query += " VALUES ("
-        num_fields = len(item)
-        for i in range(num_fields):
-            if (i != num_fields - 1):
-                query += "?, "
-            else:
-                query += "?)"
-
-        q_obj = QSqlQuery()
-        # insert series into the series table in case it doesn't exist
-        if ("series_name" in item.keys()):
-            # check for old series
-            q_obj.prepare("SELECT * FROM series WHERE name=?")
-            q_obj.bindValue(0, item["series_name"])
-            q_obj.exec()
-            q_obj.next()
-            old_series = q_obj.record()
-
-            if (old_series.isNull("name")):
-                # series doesn't exist so just add it
-                q_obj.prepare("INSERT INTO series (name, num_games, total_playtime) VALUES (?, ?, ?)")
-                q_obj.bindValue(0, item["series_name"])
-                q_obj.bindValue(1, 1)
-                q_obj.bindValue(2, item["hours_played"])
-                q_obj.exec()
-            else:
-                # series exists so update derived attributes
-                q_obj.prepare("UPDATE series SET num_games=?, total_playtime=? WHERE name=?")
-                q_obj.bindValue(0, old_series.value("num_games") + 1)
-                q_obj.bindValue(1, old_series.value("total_playtime") + float(item["hours_played"]))
-                q_obj.bindValue(2, item["series_name"])
-                q_obj.exec()
-
-        # add the actual game
-        q_obj.prepare(query)
-        for i, v in enumerate(item):
-            q_obj.bindValue(i, item[v])
-        rv = q_obj.exec()
-
-        # add genres
-        if (genres is not None):
-            for i in range(len(genres)):
-                q_obj.prepare("INSERT INTO genre (game_name, name) VALUES (?, ?)")
-                q_obj.bindValue(0, item["name"])
-                q_obj.bindValue(1, genres[i])
-                q_obj.exec()
-
-        # add platforms
-        if (platforms is not None):
-            for i in range(len(platforms)):
-                q_obj.prepare("INSERT INTO platform (game_name, name) VALUES (?, ?)")
-                q_obj.bindValue(0, item["name"])
-                q_obj.bindValue(1, platforms[i])
-                q_obj.exec()
+    def fill_tags(self, table, rows):
+        """
+        puts the given (game name, tag) rows in the batch temp table of table ("genre" or "platform"),
+        for link_tags
+        """
+        q_obj = self.query()
+        q_obj.exec("CREATE TEMP TABLE IF NOT EXISTS batch_" + table + "(game_name VARCHAR(25), name VARCHAR(20))")
+        q_obj.exec("DELETE FROM batch_" + table)
+        return self.exec_rows("INSERT INTO batch_" + table + " (game_name, name) VALUES (?, ?)", rows)
 
-        q_obj.finish()
+    def link_tags(self, table):
+        """
+        links the games in the batch temp table of table ("genre" or "platform") to their tags,
+        adding tags its dictionary doesn't have yet; rows for games that don't exist are skipped
+        """
+        rv = self.statement("INSERT OR IGNORE INTO " + table + "_dict (name) "
+                            "SELECT DISTINCT name FROM batch_" + table + " WHERE name IS NOT NULL ORDER BY name").exec()
+        return rv and self.statement("INSERT OR IGNORE INTO game_" + table + " (game_id, " + table + "_id) "
+                                     "SELECT game.id, " + table + "_dict.id FROM batch_" + table + " AS tags "
+                                     "JOIN game ON (game.name == tags.game_name) JOIN " + table + "_dict ON (" + table + "_dict.name == tags.name)").exec()
+
+    def exec_rows(self, query, rows):
+        """
+        runs the cached statement for query once for each tuple of values in rows,
+        returning whether every run succeeded
+        """
+        # QtSQLite only emulates execBatch, copying the bound lists for every row,
+        # so it gets slower the bigger the batch; binding row by row doesn't
+        q_obj = self.statement(query)
+        for row in rows:
+            for i in range(len(row)):
+                q_obj.bindValue(i, row[i])
+            if (not q_obj.exec()):
+                return False
+        return True
+
+    def query(self, con=None):
+        """
+        returns a new query on con (the main connection by default) that the tracer records
+        """
+        return TracedQuery(self.tracer, self.db if con is None else con)
+
+    def statement(self, query):
+        """
+        returns a QSqlQuery on the main connection with query prepared, reusing the one
+        prepared last time the same sql was asked for if it's still in the cache
+        """
+        q = self.statements.get(query)
+        if (q is not None):
+            self.statement_hits += 1
+            self.statements.move_to_end(query)
+            q.finish()
+            return q
+
+        self.statement_misses += 1
+        q = self.query()
+        q.prepare(query)
+        self.statements[query] = q
+        if (len(self.statements) > self.STATEMENT_CACHE_SIZE):
+            self.statements.popitem(last=False)
+        return q
+
+    def finish_statements(self):
+        """
+        resets every cached query, so none of them still has rows open (which would stop
+        the tables they read from being changed by DDL)
+        """
+        for q in self.statements.values():
+            q.finish()
+
+    def get_statement_stats(self):
+        """
+        returns the statement cache's size, hits and misses
+        """
+        return {"size": len(self.statements), "hits": self.statement_hits, "misses": self.statement_misses}
+
+    def finish_write(self, rv, con=None):
+        """
+        commits the current write transaction if rv is True, otherwise rolls it back
+        """
+        con = self.db if con is None else con
+        if (not rv):
+            con.rollback()
+            return False
+        rv = con.commit()
+        self.bump_data_version()
         return rv
 
     def edit_item(self, old_name, item, genres, platforms):
@@ -457,187 +1390,84 @@ class database:
         genres: list of genres to add for a game
         platforms: list of platforms to add for a game
         """
-        q_obj = QSqlQuery()
-        # retrieve old record of the game
-        q_obj.prepare("SELECT * FROM game WHERE name=?")
-        q_obj.bindValue(0, old_name)
-        q_obj.exec()
-        q_obj.last()
-        old_game = q_obj.record()
-
-        # construct update query for game table
-        query = "UPDATE game SET "
-        for k in item:
-            query += k + "=?,"
-
-        query = query [:len(query) - 1] + " "
-        query += "WHERE name=?"
-
-        # bind values and execute query
-        q_obj.prepare(query)
-        for i, k in enumerate(item):
-            q_obj.bindValue(i, item[k])
-            if (i == len(item) - 1):
-                q_obj.bindValue(i + 1, item["name"])
-        rv = q_obj.exec()
+        self.db.transaction()
+
+        # construct update query for game table, always listing the columns in the same
+        # order so edits of the same columns share one cached statement
+        columns = [c for c in self.GAME_COLUMNS if c in item]
+        query = "UPDATE game SET " + ", ".join(c + "=?" for c in columns) + " WHERE name=?"
+
+        # bind values and execute query; genres and platforms are linked to the game's id, so renaming
+        # it doesn't touch them, and its old and new series are kept up to date (see the triggers in createDB.sql)
+        rv = self.exec_rows(query, [tuple(item[c] for c in columns) + (old_name,)])
         if (not rv):
-            return False
+            return self.finish_write(False)
 
-        # add new series
-        if ("series_name" in item.keys()):
-            # check if old series is the same as new series and update derived attributes
-            old_series = None
-            if (not old_game.isNull("series_name")):
-                q_obj.prepare("SELECT * FROM series WHERE name=?")
-                q_obj.bindValue(0, old_game.value("series_name"))
-                q_obj.exec()
-                q_obj.next()
-                old_series = q_obj.record()
-
-            # old series = new series so update attributes based on new series
-            if (not old_series is None and (item["series_name"] == old_game.value("series_name"))):
-                old_hours = 0.0 if old_game.isNull("hours_played") else float(old_game.value("hours_played"))
-                old_total = 0.0 if old_series.isNull("total_playtime") else float(old_series.value("total_playtime"))
-
-                q_obj.prepare("UPDATE series SET total_playtime=? WHERE name=?")
-                q_obj.bindValue(0, float(item["hours_played"]) + old_total - old_hours)
-                q_obj.bindValue(1, old_game.value("series_name"))
-                q_obj.exec()
-            # old series and new series are different
-            elif (not old_series is None and (item["series_name"] != old_game.value("series_name"))):
-                old_hours = 0.0 if old_game.isNull("hours_played") else float(old_game.value("hours_played"))
-                old_total = 0.0 if old_series.isNull("total_playtime") else float(old_series.value("total_playtime"))
-                old_num = old_series.value("num_games")
-
-                # if old series still has at least one game attached, update it
-                if (old_num - 1 > 0):
-                    q_obj.prepare("UPDATE series SET num_games=?, total_playtime=? WHERE name=?")
-                    q_obj.bindValue(0, old_num - 1)
-                    q_obj.bindValue(1, old_total - old_hours)
-                    q_obj.bindValue(2, old_game.value("series_name"))
-                    q_obj.exec()
-                # old series has no games left, delete it
-                else:
-                    q_obj.prepare("DELETE FROM series WHERE name=?")
-                    q_obj.bindValue(0, old_game.value("series_name"))
-                    q_obj.exec()
-            # no old series, so add new series
-            else:
-                q_obj.prepare("INSERT INTO series (name, num_games, total_playtime) VALUES (?, ?, ?)")
-                q_obj.bindValue(0, item["series_name"])
-                q_obj.bindValue(1, 1)
-                q_obj.bindValue(2, item["hours_played"])
-                q_obj.exec()
-
-        q_obj.prepare("SELECT * FROM genre WHERE game_name=?")
-        q_obj.bindValue(0, old_game.value("name"))
-        q_obj.exec()
-        q_obj.next()
-        old_genres = self.get_genres(old_game.value("name"))
+        old_genres = self.get_genres(item["name"])
 
         # replace old genre records with new ones
         if (set(old_genres) != set(genres)):
-            q_obj.prepare("DELETE FROM genre WHERE game_name=?")
-            q_obj.bindValue(0, old_game.value("name"))
-            q_obj.exec()
+            rv = rv and self.exec_rows("DELETE FROM game_genre WHERE game_id = (SELECT id FROM game WHERE name=?)", [(item["name"],)])
 
             if (genres is not None):
                 # add genres
-                for i in range(len(genres)):
-                    q_obj.prepare("INSERT INTO genre (game_name, name) VALUES (?, ?)")
-                    q_obj.bindValue(0, item["name"])
-                    q_obj.bindValue(1, genres[i])
-                    rv = q_obj.exec()
-
-        q_obj.prepare("SELECT * FROM platform WHERE game_name=?")
-        q_obj.bindValue(0, old_game.value("name"))
-        q_obj.exec()
-        q_obj.next()
-        old_platforms = self.get_platforms(old_game.value("name"))
+                rv = rv and self.fill_tags("genre", [(item["name"], g) for g in genres]) and self.link_tags("genre")
+
+        old_platforms = self.get_platforms(item["name"])
 
         # replace old platform records with new ones
         if (set(old_platforms) != set(platforms)):
-            q_obj.prepare("DELETE FROM platform WHERE game_name=?")
-            q_obj.bindValue(0, old_game.value("name"))
-            q_obj.exec()
+            rv = rv and self.exec_rows("DELETE FROM game_platform WHERE game_id = (SELECT id FROM game WHERE name=?)", [(item["name"],)])
 
             # add platforms
             if (platforms is not None):
-                for i in range(len(platforms)):
-                    q_obj.prepare("INSERT INTO platform (game_name, name) VALUES (?, ?)")
-                    q_obj.bindValue(0, item["name"])
-                    q_obj.bindValue(1, platforms[i])
-                    rv = q_obj.exec()
-        return rv
+                rv = rv and self.fill_tags("platform", [(item["name"], p) for p in platforms]) and self.link_tags("platform")
+
+        rv = rv and self.index_game(item["name"])
+        return self.finish_write(rv)
 
     def delete_item(self, name):
         """
         deletes the game with the given name
         """
-        q_obj = QSqlQuery()
-        q_obj.prepare("SELECT * FROM game WHERE name=?")
-        q_obj.bindValue(0, name)
-        q_obj.exec()
-        q_obj.next()
-        old_game = q_obj.record()
+        return self.delete_items([name])
 
-        q_obj.prepare("DELETE FROM game WHERE name=?")
-        q_obj.bindValue(0, name)
-        rv = q_obj.exec()
-        if not rv:
-            return False
-
-        # delete associated genres and platforms
-        q_obj.prepare("DELETE FROM genre WHERE game_name=?")
-        q_obj.bindValue(0, name)
-        rv = q_obj.exec()
+    def delete_items(self, names):
+        """
+        deletes the games with the given names, along with their genres and platforms,
+        in one transaction; returns whether it succeeded
+        """
+        self.db.transaction()
+        rv = self.fill_batch(names)
 
-        q_obj.prepare("DELETE FROM platform WHERE game_name=?")
-        q_obj.bindValue(0, name)
-        q_obj.exec()
+        # take the games out of the search index while their ids are still known
+        rv = rv and self.statement("DELETE FROM game_search WHERE rowid IN (SELECT id FROM game WHERE name IN (SELECT name FROM batch_games))").exec()
 
-        # update series
-        if (not old_game.isNull("series_name")):
-            q_obj.prepare("SELECT * FROM series WHERE name=?")
-            q_obj.bindValue(0, old_game.value("series_name"))
-            q_obj.exec()
-            q_obj.next()
-            old_series = q_obj.record()
-
-            if (old_series is not None and not old_series.isNull("num_games")):
-                # at least one game in series left, so update it
-                if (old_series.value("num_games") - 1 > 0):
-                    old_hours = 0.0 if old_game.isNull("hours_played") else float(old_game.value("hours_played"))
-                    old_total = 0.0 if old_series.isNull("total_playtime") else float(old_series.value("total_playtime"))
-
-                    q_obj.prepare("UPDATE series SET num_games=?, total_playtime=? WHERE name=?")
-                    q_obj.bindValue(0, old_series.value("num_games") - 1)
-                    q_obj.bindValue(1, old_total - old_hours)
-                    q_obj.bindValue(2, old_game.value("series_name"))
-                    q_obj.exec()
-                # no games in series left, so delete it
-                else:
-                    q_obj.prepare("DELETE FROM series WHERE name=?")
-                    q_obj.bindValue(0, old_game.value("series_name"))
-                    q_obj.exec()
+        # delete the games and their associated genres and platforms; their series
+        # are updated, or deleted if they have no games left, by the game_delete_series trigger
+        rv = rv and self.statement("DELETE FROM game_genre WHERE game_id IN (SELECT id FROM game WHERE name IN (SELECT name FROM batch_games))").exec()
+        rv = rv and self.statement("DELETE FROM game_platform WHERE game_id IN (SELECT id FROM game WHERE name IN (SELECT name FROM batch_games))").exec()
+        rv = rv and self.statement("DELETE FROM game WHERE name IN (SELECT name FROM batch_games)").exec()
+        return self.finish_write(rv)
 
     def get_game(self, name):
         """
         returns a game item given a name
         """
-        q_obj = QSqlQuery()
-        q_obj.prepare("SELECT * FROM game WHERE name=?")
+        q_obj = self.statement("SELECT " + ", ".join(self.GAME_COLUMNS) + " FROM game WHERE name=?")
         q_obj.bindValue(0, name)
         q_obj.exec()
         q_obj.next()
-        return q_obj.record()
+        record = q_obj.record()
+        q_obj.finish()
+        return record
 
     def get_genres(self, name):
         """
-        returns a list of all genres given a game's name
+        returns a list of all genres given a game's name, in alphabetical order;
+        genre is a view joining the game to its genres through game_genre (see createDB.sql)
         """
-        q_obj = QSqlQuery()
-        q_obj.prepare("SELECT * FROM genre WHERE game_name=?")
+        q_obj = self.statement("SELECT * FROM genre WHERE game_name=? ORDER BY name")
         q_obj.bindValue(0, name)
         q_obj.exec()
         genres = []
@@ -647,10 +1477,10 @@ class database:
 
     def get_platforms(self, name):
         """
-        returns a list of all platforms given a game's name
+        returns a list of all platforms given a game's name, in alphabetical order;
+        platform is a view joining the game to its platforms through game_platform (see createDB.sql)
         """
-        q_obj = QSqlQuery()
-        q_obj.prepare("SELECT * FROM platform WHERE game_name=?")
+        q_obj = self.statement("SELECT * FROM platform WHERE game_name=? ORDER BY name")
         q_obj.bindValue(0, name)
         q_obj.exec()
         platforms = []
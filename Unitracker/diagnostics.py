@@ -0,0 +1,130 @@
+# This Python file uses the following encoding: utf-8
+import time
+import json
+from collections import deque
+from PySide6.QtSql import QSqlQuery
+
+
+class QueryTracer:
+    """
+    records every statement the database class runs: its sql, how many values were bound,
+    how long exec took and how many rows it read or changed; statements slower than
+    slow_ms get their EXPLAIN QUERY PLAN saved the first time they're that slow
+    """
+    def __init__(self, slow_ms=50, trace_size=10000):
+        """
+        slow_ms: how many ms a statement can take before its plan is saved; 0 never saves plans
+        trace_size: how many of the latest runs are kept for export_trace
+        """
+        self.slow_ms = slow_ms
+        # [start time, sql, number of bound values, ms, rows, ok, the sql's stats] for each run, oldest first
+        self.trace = deque(maxlen=trace_size)
+        # [runs, total ms, max ms, rows, number of bound values] per sql, over every run since the last clear
+        self.stats = {}
+        # EXPLAIN QUERY PLAN details per sql, for statements that were slow
+        self.plans = {}
+
+    def record(self, q, sql, seconds, ok):
+        """
+        records one exec of q and returns its trace entry, which TracedQuery counts the rows it reads in
+        """
+        ms = seconds*1000
+        rows = 0 if q.isSelect() else max(q.numRowsAffected(), 0)
+        stats = self.stats.get(sql)
+        if (stats is None):
+            # the same sql always has the same placeholders, so they're only counted once
+            stats = [0, 0, 0, 0, len(q.boundValues())]
+            self.stats[sql] = stats
+        stats[0] += 1
+        stats[1] += ms
+        if (ms > stats[2]):
+            stats[2] = ms
+        stats[3] += rows
+        entry = [time.time() - seconds, sql, stats[4], ms, rows, ok, stats]
+        self.trace.append(entry)
+        if (self.slow_ms > 0 and ms >= self.slow_ms and sql not in self.plans):
+            self.plans[sql] = self.explain(q, sql)
+        return entry
+
+    def explain(self, q, sql):
+        """
+        returns the lines of sqlite's query plan for sql, run with the values bound to q
+        """
+        if (not sql.lstrip().upper().startswith(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE"))):
+            return []
+        plan = QSqlQuery(q.con)
+        plan.prepare("EXPLAIN QUERY PLAN " + sql)
+        values = q.boundValues()
+        for i in range(len(values)):
+            plan.bindValue(i, values[i])
+        details = []
+        if (plan.exec()):
+            while (plan.next()):
+                details.append(plan.value(3))
+        plan.finish()
+        return details
+
+    def top(self, n, by="max"):
+        """
+        returns (sql, runs, total ms, max ms, rows) for the n statements with the highest
+        max time (by="max"), total time (by="total") or number of runs (by="runs")
+        """
+        column = {"runs": 0, "total": 1, "max": 2}[by]
+        ranked = sorted(self.stats.items(), key=lambda item: item[1][column], reverse=True)
+        return [(sql, s[0], s[1], s[2], s[3]) for sql, s in ranked[:n]]
+
+    def clear(self):
+        self.trace.clear()
+        self.stats = {}
+        self.plans = {}
+
+    def export_trace(self, filename):
+        """
+        writes every recorded run as a line of json, with the plan of statements that had one saved;
+        returns whether it succeeded
+        """
+        try:
+            with open(filename, 'w') as f:
+                for start, sql, num_params, ms, rows, ok, stats in self.trace:
+                    line = {"time": start, "sql": sql, "params": num_params, "ms": ms, "rows": rows, "ok": ok}
+                    if (sql in self.plans):
+                        line["plan"] = self.plans[sql]
+                    f.write(json.dumps(line) + "\n")
+        except OSError:
+            return False
+        return True
+
+
+class TracedQuery(QSqlQuery):
+    """
+    a QSqlQuery that reports each exec to a QueryTracer and counts the rows read from it
+    """
+    def __init__(self, tracer, con):
+        QSqlQuery.__init__(self, con)
+        self.tracer = tracer
+        self.con = con
+        self.sql = ""
+        self.entry = None
+
+    def prepare(self, sql):
+        self.sql = sql
+        return QSqlQuery.prepare(self, sql)
+
+    def exec(self, sql=None):
+        start = time.perf_counter()
+        if (sql is None):
+            rv = QSqlQuery.exec(self)
+        else:
+            rv = QSqlQuery.exec(self, sql)
+        self.entry = self.tracer.record(self, self.sql if sql is None else sql, time.perf_counter() - start, rv)
+        return rv
+
+    def next(self):
+        if (not QSqlQuery.next(self)):
+            return False
+        # counted here rather than through the tracer, since this runs for every row read
+        entry = self.entry
+        if (entry is not None):
+            entry[4] += 1
+            entry[6][3] += 1
+        return True
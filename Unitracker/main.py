@@ -1,16 +1,21 @@
 # This Python file uses the following encoding: utf-8
 import sys
-import qdarktheme
-import json
+import os
+import time
 from PySide6.QtWidgets import QApplication, QWidget, QMainWindow, QLabel, QButtonGroup
 from PySide6.QtWidgets import QBoxLayout, QVBoxLayout, QPushButton, QGridLayout
 from PySide6.QtWidgets import QTableView, QHeaderView, QFrame, QRadioButton, QLineEdit
-from PySide6.QtWidgets import QMessageBox, QComboBox, QFileDialog, QSizePolicy, QSpacerItem
+from PySide6.QtWidgets import QMessageBox, QComboBox, QFileDialog, QSizePolicy, QSpacerItem, QProgressBar, QCheckBox
+from PySide6.QtWidgets import QTabWidget, QSpinBox, QTextBrowser
 from PySide6 import QtCore
-from PySide6.QtCore import Qt, QFile
+from PySide6.QtCore import Qt, QFile, QThreadPool, QTimer, QThread, QDate
 from PySide6.QtGui import QShortcut, QKeySequence, QIntValidator
 from PySide6.QtUiTools import QUiLoader
 from database import database
+from models import TableModel
+from workers import TransferJob, PrefetchWorker
+from styles import StylesheetCache
+from config import ConfigStore
 
 
 class MainWindow(QMainWindow):
@@ -28,18 +33,30 @@ class MainWindow(QMainWindow):
         self.settings_buttons = {} # contains most of the settings ui elements
         self.page_bar = {} # contains the ui elements for game pages
         self.game_search = {} # contains most of the ui elements for game search bar
+        self.search_column = 0 # column of the games table searches filter on
         self.files_path = "./resources/"  # used for accessing ui and database files
-
-        # load and create menus
+        self.transfer_job = None # import/export running in the background, if any
+        self.diagnostics_queries = {} # sql of each row of the diagnostics tables, by table
+        self.prefetch_worker = None # fetches the pages around the current one, once it's needed
+        self.prefetch_thread = None
+        self.stats_labels = {} # contains the labels of the stats menu's totals
+        self.stats_tables = {} # contains the stats menu's tables
+        self.config_store = ConfigStore(self.files_path + "config.json")
+        self.styles = StylesheetCache(self.files_path + "stylesheets.json", self.app_qss)
+        # the "auto" theme follows the system's while the app runs
+        self.app.styleHints().colorSchemeChanged.connect(self.follow_system_theme)
+
+        # how long each phase of starting up took, in seconds (see report_startup)
+        self.startup_times = []
+        self.startup_mark = time.perf_counter()
+
+        # create the menus that are shown right away; the others
+        # are loaded the first time they're shown (see the show functions)
         self.create_navbar()
         self.create_games_menu()
         self.create_series_menu()
-
-        self.load_settings()
-        self.load_add()
-        self.load_edit()
-        self.load_help()
         self.create_shortcuts()
+        self.mark_startup("menus")
 
         # initialize database handler
         self.db = database(self.files_path)
@@ -47,12 +64,38 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "Database Error", "Database creation failed.")
             sys.exit(-1)
         else:
+            self.mark_startup("database")
             # load config, set up games and series tables, page bar
             self.load_config()
-            self.game_table.setModel(self.db.get_games())
-            self.game_table.model().setFilterCaseSensitivity(Qt.CaseInsensitive)
+            self.mark_startup("config")
+            header = self.game_table.horizontalHeader()
+            self.sort_games(header.sortIndicatorSection(), header.sortIndicatorOrder())
+            header.sortIndicatorChanged.connect(self.sort_games)
+            self.mark_startup("games table")
             self.series_table.setModel(self.db.get_series())
-            self.update_page_bar()
+            self.mark_startup("series table")
+
+    def mark_startup(self, phase):
+        """
+        records how long the phase of starting up that just finished took
+        """
+        now = time.perf_counter()
+        self.startup_times.append((phase, now - self.startup_mark))
+        self.startup_mark = now
+
+    def report_startup(self):
+        """
+        prints how long each phase of starting up took, if the UNITRACKER_STARTUP_TIMES
+        environment variable is set; called once the event loop is running
+        """
+        self.mark_startup("first event")
+        if (os.environ.get("UNITRACKER_STARTUP_TIMES")):
+            for phase, seconds in self.startup_times:
+                print(f"{phase:>16}: {seconds*1000:8.1f} ms")
+            print(f"{'total':>16}: {sum(t for p, t in self.startup_times)*1000:8.1f} ms")
+            stats = self.styles.get_stats()
+            print(f"stylesheets: {stats['hits']} cached, {stats['misses']} built in {stats['build_seconds']*1000:.1f} ms, "
+                  f"applied in {stats['apply_seconds']*1000:.1f} ms")
 
     # manual menu creation functions
     def create_games_menu(self):
@@ -68,9 +111,13 @@ class MainWindow(QMainWindow):
         self.game_table.verticalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.game_table.verticalHeader().hide()
         self.game_table.setGridStyle(Qt.SolidLine)
-        self.game_table.setSortingEnabled(True)
+        # sorting is done by the database over the whole library, so the header
+        # only tracks the sort column instead of sorting the view
+        header = self.game_table.horizontalHeader()
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(True)
         # set default order to descending by game name
-        self.game_table.sortByColumn(0, Qt.DescendingOrder)
+        header.setSortIndicator(0, Qt.DescendingOrder)
 
         title = QLabel("Games")
         title.setAlignment(Qt.AlignCenter)
@@ -158,7 +205,7 @@ class MainWindow(QMainWindow):
         for i in range(1, len(sbl) + 1):
             self.game_search["options"].addButton(sbl[i - 1], i)
             if (i == 1):
-                sbl[i].setChecked(True)
+                sbl[i - 1].setChecked(True)
             sbl[i - 1].setToolTip("Filter by " + sbl[i - 1].text())
             search_box.addWidget(sbl[i - 1], 1, i)
 
@@ -196,15 +243,18 @@ class MainWindow(QMainWindow):
         exit = QShortcut(QKeySequence("Ctrl+Q"), self)
         goto_games = QShortcut(QKeySequence("Alt+G"), self)
         goto_series = QShortcut(QKeySequence("Alt+R"), self)
+        goto_stats = QShortcut(QKeySequence("Alt+T"), self)
         goto_add = QShortcut(QKeySequence("Alt+A"), self)
         goto_settings = QShortcut(QKeySequence("Alt+S"), self)
         goto_edit = QShortcut(QKeySequence("Alt+E"), self)
         goto_delete = QShortcut(QKeySequence("Alt+D"), self)
         goto_help = QShortcut(QKeySequence("Alt+H"), self)
 
-        exit.activated.connect(sys.exit)
+        # closing the window (rather than exiting here) lets closeEvent finish saving and background work
+        exit.activated.connect(self.close)
         goto_games.activated.connect(self.show_games)
         goto_series.activated.connect(self.show_series)
+        goto_stats.activated.connect(self.show_stats)
         goto_add.activated.connect(self.show_add)
         goto_settings.activated.connect(self.show_settings)
         goto_edit.activated.connect(self.show_edit)
@@ -222,6 +272,8 @@ class MainWindow(QMainWindow):
         games.setToolTip("Opens the games menu")
         series = QPushButton("Series")
         series.setToolTip("Opens the series menu")
+        stats = QPushButton("Stats")
+        stats.setToolTip("Opens the library statistics menu")
         add_game = QPushButton("Add Game")
         add_game.setToolTip("Opens the add game menu")
         edit_game = QPushButton("Edit Game")
@@ -235,6 +287,7 @@ class MainWindow(QMainWindow):
 
         nav_bar.addWidget(games)
         nav_bar.addWidget(series)
+        nav_bar.addWidget(stats)
         nav_bar.addWidget(add_game)
         nav_bar.addWidget(edit_game)
         nav_bar.addWidget(delete_game)
@@ -245,6 +298,7 @@ class MainWindow(QMainWindow):
         settings.clicked.connect(self.show_settings)
         games.clicked.connect(self.show_games)
         series.clicked.connect(self.show_series)
+        stats.clicked.connect(self.show_stats)
         add_game.clicked.connect(self.show_add)
         edit_game.clicked.connect(self.show_edit)
         delete_game.clicked.connect(self.delete_game)
@@ -256,10 +310,9 @@ class MainWindow(QMainWindow):
     # config saving/loading functions
     def save_config(self):
         """
-        saves the current config to a json file
+        saves the current config to a json file, shortly after the last change (see config.py)
         """
-        with open(self.files_path + "config.json", 'w') as f:
-            json.dump(self.config, f)
+        self.config_store.save()
 
     def load_config(self):
         """
@@ -267,28 +320,54 @@ class MainWindow(QMainWindow):
         or if no valid config file exists, uses defaults
         """
         # try loading a config file
-        try:
-            f = open(self.files_path + "config.json")
-            config = json.load(f)
-            if (config is None or "text_size" not in config or "theme" not in config
-                or "screen_size" not in config or "items_per_page" not in config):
-                f.close()
-                raise FileNotFoundError
-            self.config = config
-            f.close()
-        except FileNotFoundError:
-            # no file found so use defaults
-            self.config = {"text_size": 1, "theme": "auto", "items_per_page": 15, "screen_size": 1}
-
-        # update configuration
-        self.update_font(self.config["text_size"])
-        self.set_theme(theme=self.config["theme"])
+        config = self.config_store.load()
+        if (not isinstance(config, dict) or "text_size" not in config or "theme" not in config
+            or "screen_size" not in config or "items_per_page" not in config):
+            # no valid file found so use defaults
+            self.config_store.set({"text_size": 1, "theme": "auto", "items_per_page": 15, "screen_size": 1})
+        self.config = self.config_store.data
+        # config files from before these settings existed get their defaults
+        if ("storage" not in self.config):
+            self.config["storage"] = dict(self.db.STORAGE_PROFILES["safe"])
+        if ("continuous_scroll" not in self.config):
+            self.config["continuous_scroll"] = False
+        if (not isinstance(self.config.get("slow_query_ms"), int) or self.config["slow_query_ms"] < 0):
+            self.config["slow_query_ms"] = self.db.tracer.slow_ms
+        if (self.config.get("prefetch_depth") not in range(0, 11)):
+            self.config["prefetch_depth"] = 1
+
+        # update configuration; the settings menu shows it once it's loaded (see sync_settings)
+        self.current_theme = self.config["theme"]
+        self.apply_style()
+        self.db.set_items_per_page(self.config["items_per_page"])
+        self.apply_screen_size(self.config["screen_size"])
+        self.db.tracer.slow_ms = self.config["slow_query_ms"]
+        if (not self.db.set_storage(self.config["storage"])):
+            QMessageBox.warning(self, "Config Error", "Invalid storage settings in config.json, using the safe ones instead.")
+            self.config["storage"] = dict(self.db.STORAGE_PROFILES["safe"])
+            self.db.set_storage(self.config["storage"])
+            self.save_config()
+        if ("settings" in self.menu_dict):
+            self.sync_settings()
+
+    def sync_settings(self):
+        """
+        shows the current config in the settings menu, without running the settings' handlers
+        """
+        widgets = [self.settings_buttons["set_text"], self.settings_buttons["continuous_scroll"],
+                   self.settings_buttons["slow_query_ms"], self.settings_buttons["prefetch_depth"]]
+        for w in widgets:
+            w.blockSignals(True)
         self.settings_buttons["set_text"].setCurrentIndex(self.config["text_size"])
         self.settings_buttons[self.config["theme"]].setChecked(True)
-        self.db.set_items_per_page(self.config["items_per_page"])
         self.settings_buttons["ipp"].setText(str(self.config["items_per_page"]))
-        screen_button = self.settings_buttons["screen_size"].button(self.config["screen_size"])
-        self.set_screen_size(screen_button)
+        self.settings_buttons["screen_size"].button(self.config["screen_size"]).setChecked(True)
+        self.settings_buttons["continuous_scroll"].setChecked(self.config["continuous_scroll"])
+        self.settings_buttons["slow_query_ms"].setValue(self.config["slow_query_ms"])
+        self.settings_buttons["prefetch_depth"].setValue(self.config["prefetch_depth"])
+        for w in widgets:
+            w.blockSignals(False)
+        self.show_storage_profile()
 
     # functions to set options
     def set_theme(self, checked=False, theme=None):
@@ -297,7 +376,6 @@ class MainWindow(QMainWindow):
         or which button in settings is checked
         """
         if (theme is not None):
-            qdarktheme.setup_theme(theme, additional_qss=self.font_qss)
             self.current_theme = theme
         else:
             light_b = self.settings_buttons["light"]
@@ -306,24 +384,43 @@ class MainWindow(QMainWindow):
 
             # set theme
             if (light_b.isChecked()):
-                qdarktheme.setup_theme("light", additional_qss=self.font_qss)
                 self.current_theme = "light"
             elif (dark_b.isChecked()):
-                qdarktheme.setup_theme("dark", additional_qss=self.font_qss)
                 self.current_theme = "dark"
             elif (system_b.isChecked()):
-                qdarktheme.setup_theme("auto", additional_qss=self.font_qss)
                 self.current_theme = "auto"
-            self.update_font(self.config["text_size"])
-            self.config["theme"] = self.current_theme
-            self.save_config()
+        self.apply_style()
+        self.config["theme"] = self.current_theme
+        self.save_config()
 
     def update_font(self, index):
         """
         update the app's text size based on preset options: small, medium, large
         """
+        self.config["text_size"] = index
+        self.apply_style()
+        self.save_config()
+
+    def apply_style(self):
+        """
+        styles the app for the current theme and text size, with a stylesheet
+        that's only built the first time that pair is used (see styles.py)
+        """
+        self.styles.apply(self.app, self.current_theme, self.config["text_size"])
+
+    def follow_system_theme(self, scheme):
+        """
+        restyles the app when the system switches between light and dark, if the theme is "auto"
+        """
+        if (self.current_theme == "auto"):
+            self.apply_style()
+
+    def app_qss(self, theme, index):
+        """
+        returns the qss added to a theme ("light" or "dark") for a text size: small, medium, large
+        """
         if (index == 0):
-            self.font_qss = """
+            font_qss = """
             * {
                 font-size: 14px;
             }
@@ -335,7 +432,7 @@ class MainWindow(QMainWindow):
             }
             """            
         elif (index == 1):
-            self.font_qss = """
+            font_qss = """
             * {
                 font-size: 20px;
             }
@@ -347,7 +444,7 @@ class MainWindow(QMainWindow):
             }
             """
         elif (index == 2):
-            self.font_qss = """
+            font_qss = """
             * {
                 font-size: 26px;
             }
@@ -360,36 +457,82 @@ class MainWindow(QMainWindow):
             """
 
         # ensure pushbuttons are actually highlighted when tabbed through
-        if (self.current_theme == "dark"):
-            self.font_qss += """
+        if (theme == "dark"):
+            font_qss += """
             QPushButton:focus {
                 background-color: white;
             }
             """
         else:
-            self.font_qss += """
+            font_qss += """
             QPushButton:focus {
                 background-color: lightgrey;
             }
             """
-
-        qdarktheme.setup_theme(self.current_theme, additional_qss=self.font_qss)
-        self.config["text_size"] = index
-        self.save_config()
+        return font_qss
 
     def set_screen_size(self, button_pressed):
         """
         sets the screen size
         """
         id = self.settings_buttons["screen_size"].id(button_pressed)
+        self.apply_screen_size(id)
+        self.config["screen_size"] = id
+        button_pressed.setChecked(True)
+        self.save_config()
+
+    def apply_screen_size(self, id):
+        """
+        sets the window state for a screen size id: 1 windowed, 2 maximized, 3 fullscreen
+        """
         if (id == 1):
             self.setWindowState(Qt.WindowNoState)
         elif (id == 2):
             self.setWindowState(Qt.WindowMaximized)
         elif (id == 3):
             self.setWindowState(Qt.WindowFullScreen)
-        self.config["screen_size"] = id
-        button_pressed.setChecked(True)
+
+    def set_storage_profile(self, index):
+        """
+        applies the storage profile picked in settings: safe or fast
+        """
+        profile = ["safe", "fast"][index] if index < 2 else None
+        if (profile is None or profile == self.db.get_storage_profile()):
+            return
+        # changing the journal mode needs the only connection to the database, so the
+        # prefetch worker's is closed first; prefetch_pages starts it again with the new settings
+        self.stop_prefetch()
+        if (not self.db.set_storage(self.db.STORAGE_PROFILES[profile])):
+            QMessageBox.critical(self, "Storage Error", "Storage settings could not be changed")
+            self.show_storage_profile()
+        else:
+            self.config["storage"] = dict(self.db.storage)
+            self.save_config()
+        self.prefetch_pages()
+
+    def show_storage_profile(self):
+        """
+        selects the storage profile in use in settings, or "Custom" if config.json
+        has storage settings that aren't one of the profiles
+        """
+        combo = self.settings_buttons["storage"]
+        profile = self.db.get_storage_profile()
+        combo.blockSignals(True)
+        if (profile is None):
+            if (combo.count() < 3):
+                combo.addItem("Custom")
+            combo.setCurrentIndex(2)
+        else:
+            combo.setCurrentIndex(["safe", "fast"].index(profile))
+        combo.blockSignals(False)
+
+    def set_continuous_scroll(self, checked):
+        """
+        switches the games table between pages and one continuously scrolling table
+        """
+        self.config["continuous_scroll"] = bool(checked)
+        self.set_game_model(self.db.get_games())
+        self.update_page_bar()
         self.save_config()
 
     def update_ipp(self):
@@ -400,104 +543,214 @@ class MainWindow(QMainWindow):
         t = int(ipp)
         self.db.set_items_per_page(t)
         self.config["items_per_page"] = t
-        self.game_table.setModel(self.db.get_games())
+        self.set_game_model(self.db.get_games())
         self.update_page_bar()
         self.save_config()
         QMessageBox.information(self, "Success", "Games per page successfully updated")
 
+    # diagnostics functions
+    def set_slow_query_ms(self, value):
+        """
+        sets how long a query can take before its plan is saved, from the diagnostics tab
+        """
+        self.config["slow_query_ms"] = value
+        self.db.tracer.slow_ms = value
+        self.save_config()
+
+    def show_diagnostics(self):
+        """
+        fills the diagnostics tab's tables with the slowest and most frequently run queries so far
+        """
+        headers = ["Query", "Runs", "Total (ms)", "Slowest (ms)", "Rows"]
+        for name, by in [("slowest_queries", "max"), ("frequent_queries", "runs")]:
+            top = self.db.tracer.top(10, by)
+            self.diagnostics_queries[name] = [t[0] for t in top]
+            rows = [(" ".join(sql.split()), runs, round(total, 2), round(slowest, 2), num_rows)
+                    for sql, runs, total, slowest, num_rows in top]
+            table = self.settings_buttons[name]
+            table.setModel(TableModel(headers, rows))
+            table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+            table.selectionModel().currentRowChanged.connect(lambda current, previous, name=name: self.show_query_plan(name, current.row()))
+        self.settings_buttons["query_plan"].clear()
+
+    def show_query_plan(self, name, row):
+        """
+        shows the full text of a query picked in one of the diagnostics tables, and its plan if it was slow
+        """
+        if (row < 0 or row >= len(self.diagnostics_queries[name])):
+            return
+        sql = self.diagnostics_queries[name][row]
+        plan = self.db.tracer.plans.get(sql)
+        text = sql.strip() + "\n\n"
+        if (plan is None):
+            text += "No plan saved; it hasn't been slower than the threshold."
+        elif (len(plan) == 0):
+            text += "SQLite only has plans for SELECT, INSERT, UPDATE and DELETE queries."
+        else:
+            text += "Query plan:\n" + "\n".join(plan)
+        self.settings_buttons["query_plan"].setPlainText(text)
+
+    def clear_trace(self):
+        self.db.tracer.clear()
+        self.show_diagnostics()
+
+    def export_trace(self):
+        """
+        prompts user for a file and saves every recorded query run to it as json lines
+        """
+        file_name = QFileDialog.getSaveFileName(self.menu_dict["settings"], "Choose trace file", "~/", "(*.jsonl)")[0]
+        if (file_name == ""):
+            return
+        if (self.db.tracer.export_trace(file_name)):
+            QMessageBox.information(self, "Export Success", "Query trace successfully exported!")
+        else:
+            QMessageBox.critical(self, "Export Error", "Query trace could not be exported.")
+
     # import/export functions
     def start_import(self):
         """
         prompts user for file, and displays chosen file name
         """
-        file_name = QFileDialog.getOpenFileName(self.menu_dict["settings"], "Choose import file", "~/", "(*.sqlite *.json)")
+        file_name = QFileDialog.getOpenFileName(self.menu_dict["settings"], "Choose import file", "~/", "(*.sqlite *.json *.jsonl)")
         chosen = self.menu_dict["settings"].findChild(QLabel, "chosen_import")
         chosen.setText(file_name[0])
 
     def finish_import(self):
         """
-        called when user clicks "Import"; handles the actual importing
-        and displaying the result to the user
+        called when user clicks "Import"; starts importing the chosen file in the background
         """
         chosen = self.menu_dict["settings"].findChild(QLabel, "chosen_import")
         to_import = chosen.text()
-        success = False
-        if (to_import[-6:] == "sqlite"):
-            if (self.db.import_db(to_import)):
-                success = True
-        elif (to_import[-4:] == "json"):
-            if (self.db.import_json(to_import)):
-                success = True
-        else:
+        if (to_import[-6:] != "sqlite" and to_import[-4:] != "json" and to_import[-5:] != "jsonl"):
             QMessageBox.critical(self, "Import Error", "Unsupported file format selected.")
             return
-
-        if (success):
-            QMessageBox.information(self, "Import Success", "Games successfully imported!")
-            self.game_table.setModel(self.db.get_games())
-            self.series_table.setModel(self.db.get_series())
-            self.update_page_bar()
-        else:
-            QMessageBox.critical(self, "Import Error", "Import failed")
+        self.start_transfer("import", to_import)
 
     def start_export(self):
         """
-        handle calling the right export function and displaying result to user
+        prompts user for an export file and starts exporting to it in the background
         """
-        file_name = QFileDialog.getSaveFileName(self.menu_dict["settings"], "Choose export file", "~/", "(*.sqlite *.json)")[0]
-        success = False
-        if (file_name[-6:] == "sqlite"):
-            if (self.db.export_db(file_name)):
-                success = True
-        elif (file_name[-4:] == "json"):
-            if (self.db.export_json(file_name)):
-                success = True
-        else:
+        file_name = QFileDialog.getSaveFileName(self.menu_dict["settings"], "Choose export file", "~/", "(*.sqlite *.json *.jsonl)")[0]
+        if (file_name[-6:] != "sqlite" and file_name[-4:] != "json" and file_name[-5:] != "jsonl"):
             QMessageBox.critical(self, "Export Error", "Unsupported file format selected.")
             return
+        self.start_transfer("export", file_name)
+
+    def start_transfer(self, kind, file_name):
+        """
+        runs an import or export on a worker thread, showing its progress in the settings menu
+        """
+        if (self.transfer_job is not None):
+            return
+        self.transfer_job = TransferJob(self.files_path, kind, file_name, dict(self.db.storage))
+        self.transfer_job.signals.progress.connect(self.show_transfer_progress)
+        self.transfer_job.signals.finished.connect(self.finish_transfer)
+
+        self.settings_buttons["import"].setEnabled(False)
+        self.settings_buttons["export"].setEnabled(False)
+        self.settings_buttons["progress"].setRange(0, 0)
+        self.settings_buttons["progress"].show()
+        self.settings_buttons["transfer_status"].setText(kind.capitalize() + "ing...")
+        self.settings_buttons["transfer_status"].show()
+        self.settings_buttons["cancel_transfer"].show()
+        QThreadPool.globalInstance().start(self.transfer_job)
+
+    def show_transfer_progress(self, done, total, rows_per_second):
+        """
+        updates the settings menu's progress bar with the running import/export's progress
+        """
+        self.settings_buttons["progress"].setRange(0, max(total, 1))
+        self.settings_buttons["progress"].setValue(done)
+        self.settings_buttons["transfer_status"].setText(f"{done} of {total} rows ({rows_per_second:.0f} rows/s)")
 
-        if (success):
+    def cancel_transfer(self):
+        """
+        cancels the running import/export; an import is rolled back, leaving the games as they were
+        """
+        if (self.transfer_job is not None):
+            self.transfer_job.cancel()
+
+    def finish_transfer(self, success, cancelled, rows, rows_per_second):
+        """
+        called when the worker is done importing/exporting; displays the result to the user
+        """
+        kind = self.transfer_job.kind
+        self.transfer_job = None
+        self.settings_buttons["import"].setEnabled(True)
+        self.settings_buttons["export"].setEnabled(True)
+        self.settings_buttons["progress"].hide()
+        self.settings_buttons["transfer_status"].hide()
+        self.settings_buttons["cancel_transfer"].hide()
+
+        title = kind.capitalize()
+        if (cancelled):
+            QMessageBox.information(self, title + " Cancelled", title + " cancelled, nothing was changed.")
+        elif (not success):
+            QMessageBox.critical(self, title + " Error", title + " failed")
+        elif (kind == "export"):
             QMessageBox.information(self, "Export Success", "Games successfully exported!")
         else:
-            QMessageBox.critical(self, "Export Error", "Export failed")
+            # the worker replaced the games through its own connection, so reload everything
+            self.db.bump_data_version()
+            self.set_game_model(self.db.get_games())
+            self.series_table.setModel(self.db.get_series())
+            self.update_page_bar()
+            message = "Games successfully imported!"
+            if (rows > 0):
+                message += f"\n{rows} rows imported ({rows_per_second:.0f} rows/s)"
+            QMessageBox.information(self, "Import Success", message)
+
+    def wait_for_transfer(self):
+        """
+        cancels any running import/export and waits for it, so the app can close
+        """
+        self.cancel_transfer()
+        QThreadPool.globalInstance().waitForDone()
 
     # page functions
+    def set_game_model(self, page):
+        """
+        shows page, the first page of the games in their current order and search,
+        or all of them in one scrolling table in continuous scrolling mode
+        """
+        # rows fill the table evenly on a page, but keep their own height when scrolling
+        if (self.config["continuous_scroll"]):
+            self.game_table.verticalHeader().setSectionResizeMode(QHeaderView.Interactive)
+            self.game_table.setModel(self.db.get_scrolling_games())
+        else:
+            self.game_table.verticalHeader().setSectionResizeMode(QHeaderView.Stretch)
+            self.game_table.setModel(page)
+
     def next_page(self):
         """
-        tries going to next page; updates visibility of next page button,
-        and updates the table view
+        tries going to next page; updates the page bar and the table view
         """
         new_model = self.db.forward_page()
         if (new_model is not None):
             self.game_table.setModel(new_model)
-            if (not self.db.has_next_page()):
-                self.page_bar["next"].hide()
-            self.page_bar["label"].setText(f'Page {self.db.get_current_page() + 1}')
-        else:
-            self.page_bar["next"].hide()
-        if (not self.page_bar["previous"].isVisible()):
-            self.page_bar["previous"].show()
+        self.update_page_bar()
 
     def previous_page(self):
         """
-        tries going to previous page; updates visibility of previous page button,
-        and updates the table view
+        tries going to previous page; updates the page bar and the table view
         """
         new_model = self.db.backward_page()
         if (new_model is not None):
             self.game_table.setModel(new_model)
-            if (self.db.get_current_page() == 0):
-                self.page_bar["previous"].hide()
-            self.page_bar["label"].setText(f'Page {self.db.get_current_page() + 1}')
-        else:
-            self.page_bar["previous"].hide()
-        if (not self.page_bar["next"].isVisible()):
-            self.page_bar["next"].show()
+        self.update_page_bar()
 
     def update_page_bar(self):
         """
-        update page buttons, label
+        update page buttons, label; uses what the last page fetch found out,
+        so no queries are run here
         """
+        if (self.config["continuous_scroll"]):
+            # everything is in one table, so there are no pages to go between
+            self.page_bar["previous"].hide()
+            self.page_bar["next"].hide()
+            self.page_bar["label"].setText(f'{self.game_table.model().total} games')
+            return
+
         if (self.db.get_current_page() == 0):
             self.page_bar["previous"].hide()
         else:
@@ -507,23 +760,94 @@ class MainWindow(QMainWindow):
             self.page_bar["next"].show()
         else:
             self.page_bar["next"].hide()
-        self.page_bar["label"].setText(f'Page {self.db.get_current_page() + 1}')
+        self.page_bar["label"].setText(f'Page {self.db.get_current_page() + 1} of {self.db.get_page_count()}')
+        self.prefetch_pages()
+
+    def set_prefetch_depth(self, depth):
+        """
+        sets how many pages before and after the current one are fetched ahead of time
+        """
+        self.config["prefetch_depth"] = depth
+        self.save_config()
+        self.prefetch_pages()
+
+    def prefetch_pages(self):
+        """
+        has the prefetch worker fetch the pages around the current one that aren't cached yet,
+        so turning to them shows rows that are already there instead of waiting on a query
+        """
+        depth = self.config["prefetch_depth"]
+        if (depth == 0 or self.config["continuous_scroll"]):
+            return
+        forward, backward = self.db.pages_to_prefetch(depth)
+        if (len(forward) == 0 and len(backward) == 0):
+            return
+        if (self.prefetch_worker is None):
+            self.prefetch_thread = QThread()
+            self.prefetch_worker = PrefetchWorker(self.files_path, dict(self.db.storage))
+            self.prefetch_worker.moveToThread(self.prefetch_thread)
+            self.prefetch_worker.fetched.connect(self.store_prefetched)
+            self.prefetch_worker.stopping.connect(self.prefetch_worker.close, Qt.BlockingQueuedConnection)
+            self.prefetch_thread.start()
+        self.prefetch_worker.request(self.db.get_page_state(), forward, backward)
+
+    def store_prefetched(self, results):
+        self.db.store_pages(results)
+
+    def stop_prefetch(self):
+        """
+        closes the prefetch worker's connection and stops its thread, so the app can close
+        """
+        if (self.prefetch_worker is not None):
+            self.prefetch_worker.stopping.emit()
+            self.prefetch_thread.quit()
+            self.prefetch_thread.wait()
+            self.prefetch_worker = None
+
+    def closeEvent(self, event):
+        """
+        finishes background work before the window closes, since it's deleted on close (see __main__)
+        and aboutToQuit comes too late to reach it
+        """
+        self.wait_for_transfer()
+        self.stop_prefetch()
+        self.config_store.flush()
+        event.accept()
+
+    # sort functions
+    def sort_games(self, column, order):
+        """
+        sorts the whole game table by the clicked column and shows the first page
+        """
+        new_model = self.db.sort_games(column, order == Qt.DescendingOrder)
+        if (new_model is None):
+            # column can't be sorted on, so put the indicator back
+            header = self.game_table.horizontalHeader()
+            order = Qt.DescendingOrder if self.db.sort_descending else Qt.AscendingOrder
+            header.blockSignals(True)
+            header.setSortIndicator(self.db.sort_column, order)
+            header.blockSignals(False)
+            return
+        self.set_game_model(new_model)
+        self.update_page_bar()
 
     # search functions
     def set_game_filter(self, button):
         """
-        sets which column the proxy model will filter on
+        sets which column searches will filter on, and reruns the current search
         """
-        column = self.game_search["options"].id(button) - 1
-        self.game_table.model().setFilterKeyColumn(column)
+        self.search_column = self.game_search["options"].id(button) - 1
+        if (len(self.game_search["bar"].text()) > 0):
+            self.search_games()
 
     def search_games(self):
         """
-        make proxy model perform the "search"/filter
-        based on what's in the search bar
+        search the whole library for what's in the search bar
+        and show the first page of results
         """
         filter = self.game_search["bar"].text()
-        self.game_table.model().setFilterRegularExpression(filter)
+        self.set_game_model(self.db.search_games(filter, self.search_column))
+        self.update_page_bar()
 
     # game functions
     def add_game(self):
@@ -531,6 +855,8 @@ class MainWindow(QMainWindow):
         constructs the item dict and genre and platform lists, then adds the game and updates the model
         """
         add = self.menu_dict["add_game"]
+        if (not self.check_dates(add)):
+            return
         game = {}
         genres = None
         platforms = None
@@ -551,10 +877,9 @@ class MainWindow(QMainWindow):
                 elif (len(f) > 0):
                     game[v] = f
 
-        if (not self.db.add_item(game, genres, platforms)):
+        if (not self.game_table.model().add_item(game, genres, platforms)):
             QMessageBox.critical(self, "Add Error", "Game was not successfully added")
-        self.game_table.setModel(self.db.get_games())
-        self.series_table.setModel(self.db.get_series())
+        self.update_series([game.get("series_name")])
         self.update_page_bar()
 
     def edit_game(self):
@@ -566,6 +891,8 @@ class MainWindow(QMainWindow):
         genres = []
         platforms = []
         edit = self.menu_dict["edit_game"]
+        if (not self.check_dates(edit)):
+            return
         for v in edit.fields:
             obj = edit.fields[v]
             if (obj is not None):
@@ -587,11 +914,34 @@ class MainWindow(QMainWindow):
                 elif (len(f) > 0):
                     game[v] = f
 
-        self.db.edit_item(self.old_game_name, game, genres, platforms)
-        self.game_table.setModel(self.db.get_games())
-        self.series_table.setModel(self.db.get_series())
+        old_series = self.db.get_game(self.old_game_name).value("series_name")
+        self.game_table.model().edit_item(self.old_game_name, game, genres, platforms)
+        self.update_series([old_series, game.get("series_name")])
+        self.leave_empty_page()
+        self.update_page_bar()
         self.show_games()
 
+    def check_dates(self, form):
+        """
+        rewrites the form's start and end dates as YYYY-MM-DD, which games finished per month is
+        counted by; warns and returns False (leaving the form as it is) if one isn't a date
+        """
+        for v in ["start_date", "end_date"]:
+            obj = form.fields[v]
+            text = obj.text().strip()
+            if (len(text) == 0):
+                continue
+            date = QDate()
+            for fmt in ["yyyy-M-d", "yyyy/M/d", "M/d/yyyy", "M-d-yyyy", "MMM d yyyy", "MMMM d yyyy"]:
+                date = QDate.fromString(text.replace(",", ""), fmt)
+                if (date.isValid()):
+                    break
+            if (not date.isValid()):
+                QMessageBox.warning(self, "Date Error", text + " isn't a date, enter it as YYYY-MM-DD.")
+                return False
+            obj.setText(date.toString("yyyy-MM-dd"))
+        return True
+
     def delete_game(self):
         """
         Prompts user for confirmation, then deletes the selected games if user confirms
@@ -617,10 +967,13 @@ class MainWindow(QMainWindow):
 
             msg = QMessageBox.question(self, "Confirm Delete", "Are you sure you want to delete the following games: \n" + game_names)
             if (msg == QMessageBox.Yes):
+                series = []
                 for i in range(len(to_delete)):
-                    self.db.delete_item(to_delete[i])
-                self.game_table.setModel(self.db.get_games())
-                self.series_table.setModel(self.db.get_series())
+                    series.append(self.db.get_game(to_delete[i]).value("series_name"))
+                self.game_table.model().delete_items(to_delete)
+                self.update_series(series)
+                self.leave_empty_page()
+                self.update_page_bar()
         # try to delete one game
         else:
             row = selected_rows[0]
@@ -628,11 +981,30 @@ class MainWindow(QMainWindow):
 
             msg = QMessageBox.question(self, "Confirm Delete", "Are you sure you want to delete the game " + game_name)
             if (msg == QMessageBox.Yes):
-                self.db.delete_item(game_name)
-                self.game_table.setModel(self.db.get_games())
-                self.series_table.setModel(self.db.get_series())
+                series = self.db.get_game(game_name).value("series_name")
+                self.game_table.model().delete_item(game_name)
+                self.update_series([series])
+                self.leave_empty_page()
                 self.update_page_bar()
 
+    def leave_empty_page(self):
+        """
+        goes back a page if deleting or editing games emptied the one being shown (only the last page can be)
+        """
+        if (self.game_table.model().rowCount() == 0 and self.db.get_current_page() > 0):
+            new_model = self.db.backward_page()
+            if (new_model is not None):
+                self.game_table.setModel(new_model)
+
+    def update_series(self, names):
+        """
+        refreshes just the rows of the given series in the series table
+        """
+        model = self.series_table.model().sourceModel()
+        for name in set(names):
+            if (name):
+                model.set_row(name, self.db.get_series_row(name))
+
     # functions for loading ui files/menus
     def load_settings(self):
         """
@@ -658,9 +1030,19 @@ class MainWindow(QMainWindow):
             self.settings_buttons["dark"] = s.findChild(QRadioButton, "dark_theme")
             self.settings_buttons["auto"] = s.findChild(QRadioButton, "system_theme")
             self.settings_buttons["screen_size"] = QButtonGroup()
+            self.settings_buttons["storage"] = s.findChild(QComboBox, "storage_profile")
             start_import = s.findChild(QPushButton, "import_button")
             select_import = s.findChild(QPushButton, "select_import")
             start_export = s.findChild(QPushButton, "export_button")
+            cancel_transfer = s.findChild(QPushButton, "cancel_transfer")
+            self.settings_buttons["import"] = start_import
+            self.settings_buttons["export"] = start_export
+            self.settings_buttons["cancel_transfer"] = cancel_transfer
+            self.settings_buttons["progress"] = s.findChild(QProgressBar, "transfer_progress")
+            self.settings_buttons["transfer_status"] = s.findChild(QLabel, "transfer_status")
+            cancel_transfer.hide()
+            self.settings_buttons["progress"].hide()
+            self.settings_buttons["transfer_status"].hide()
 
             windowed = s.findChild(QRadioButton, "windowed")
             maximized = s.findChild(QRadioButton, "maximized")
@@ -681,9 +1063,88 @@ class MainWindow(QMainWindow):
             self.settings_buttons["auto"].clicked.connect(self.set_theme)
             self.settings_buttons["set_text"].currentIndexChanged.connect(self.update_font)
             ipp.returnPressed.connect(self.update_ipp)
+            self.settings_buttons["continuous_scroll"] = s.findChild(QCheckBox, "continuous_scroll")
+            self.settings_buttons["continuous_scroll"].toggled.connect(self.set_continuous_scroll)
+            self.settings_buttons["storage"].currentIndexChanged.connect(self.set_storage_profile)
+            self.settings_buttons["prefetch_depth"] = s.findChild(QSpinBox, "prefetch_depth")
+            self.settings_buttons["prefetch_depth"].valueChanged.connect(self.set_prefetch_depth)
             select_import.clicked.connect(self.start_import)
             start_import.clicked.connect(self.finish_import)
             start_export.clicked.connect(self.start_export)
+            cancel_transfer.clicked.connect(self.cancel_transfer)
+
+            # diagnostics tab
+            tabs = s.findChild(QTabWidget, "settings_tabs")
+            diagnostics_tab = s.findChild(QWidget, "diagnostics_tab")
+            self.settings_buttons["slow_query_ms"] = s.findChild(QSpinBox, "slow_query_ms")
+            self.settings_buttons["slowest_queries"] = s.findChild(QTableView, "slowest_queries")
+            self.settings_buttons["frequent_queries"] = s.findChild(QTableView, "frequent_queries")
+            self.settings_buttons["query_plan"] = s.findChild(QTextBrowser, "query_plan")
+            tabs.currentChanged.connect(lambda index: self.show_diagnostics() if tabs.widget(index) is diagnostics_tab else None)
+            self.settings_buttons["slow_query_ms"].valueChanged.connect(self.set_slow_query_ms)
+            s.findChild(QPushButton, "refresh_diagnostics").clicked.connect(self.show_diagnostics)
+            s.findChild(QPushButton, "clear_trace").clicked.connect(self.clear_trace)
+            s.findChild(QPushButton, "export_trace").clicked.connect(self.export_trace)
+            self.sync_settings()
+
+    def load_stats(self):
+        """
+        set up the stats menu: the library's totals, and tables of games per genre,
+        per platform and finished per month
+        """
+        if ("stats" not in self.menu_dict):
+            stats_frame = QFrame()
+            stats_layout = QVBoxLayout()
+            totals = QGridLayout()
+            names = [("games", "Games:"), ("hours_played", "Hours played:"), ("completion_rate", "Completed:"),
+                     ("achievement_ratio", "Achievements:"), ("average_progress", "Average progress:"), ("series", "Series:")]
+            for i, (name, text) in enumerate(names):
+                self.stats_labels[name] = QLabel()
+                totals.addWidget(QLabel(text), i // 3, 2*(i % 3), Qt.AlignRight)
+                totals.addWidget(self.stats_labels[name], i // 3, 2*(i % 3) + 1)
+
+            # most common genres/platforms and latest months first
+            tables = QTabWidget()
+            for name, text, column in [("genres", "Genres", 1), ("platforms", "Platforms", 1), ("months", "Finished per Month", 0)]:
+                table = QTableView()
+                table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+                table.horizontalHeader().setSortIndicator(column, Qt.DescendingOrder)
+                table.verticalHeader().hide()
+                table.setSortingEnabled(True)
+                tables.addTab(table, text)
+                self.stats_tables[name] = table
+
+            title = QLabel("Stats")
+            title.setAlignment(Qt.AlignCenter)
+            stats_layout.addWidget(title)
+            stats_layout.addLayout(totals)
+            stats_layout.addWidget(tables)
+            stats_frame.setLayout(stats_layout)
+            stats_frame.hide()
+
+            self.menu_dict["stats"] = stats_frame
+            self.main_scene.addWidget(stats_frame)
+
+    def update_stats(self):
+        """
+        fills the stats menu in from the statistics tables, which are kept up to date
+        as games change, so it's quick however big the library is
+        """
+        stats = self.db.get_stats()
+        completed = stats["completed_games"]
+        self.stats_labels["games"].setText(str(stats["games"]))
+        self.stats_labels["hours_played"].setText(f'{stats["hours_played"]:g}')
+        self.stats_labels["completion_rate"].setText(f'{completed} ({stats["completion_rate"]*100:.1f}%)')
+        self.stats_labels["achievement_ratio"].setText(f'{stats["completed_achievements"]} of {stats["total_achievements"]} '
+                                                       f'({stats["achievement_ratio"]*100:.1f}%)')
+        self.stats_labels["average_progress"].setText(f'{stats["average_progress"]:.1f}%')
+        self.stats_labels["series"].setText(str(stats["series"]))
+        models = {"genres": self.db.get_genre_stats(), "platforms": self.db.get_platform_stats(), "months": self.db.get_monthly_stats()}
+        for name, table in self.stats_tables.items():
+            # keep whichever order the table was sorted in
+            header = table.horizontalHeader()
+            table.setModel(models[name])
+            table.sortByColumn(header.sortIndicatorSection(), header.sortIndicatorOrder())
 
     def load_help(self):
         """
@@ -814,7 +1275,16 @@ class MainWindow(QMainWindow):
             self.current_menu = "series"
             self.menu_dict["series"].show()
 
+    def show_stats(self):
+        self.load_stats()
+        self.update_stats()
+        if (not self.current_menu == "stats"):
+            self.menu_dict[self.current_menu].hide()
+            self.current_menu = "stats"
+            self.menu_dict["stats"].show()
+
     def show_add(self):
+        self.load_add()
         if (not self.current_menu == "add_game"):
             self.menu_dict[self.current_menu].hide()
             self.current_menu = "add_game"
@@ -845,6 +1315,7 @@ class MainWindow(QMainWindow):
             platforms = self.db.get_platforms(game_name)
 
             # populate menu fields
+            self.load_edit()
             edit = self.menu_dict["edit_game"]
             for i, f in enumerate(edit.fields):
                 if (platforms is not None and f == "platform"):
@@ -871,12 +1342,14 @@ class MainWindow(QMainWindow):
                 self.old_game_name = game_name
 
     def show_settings(self):
+        self.load_settings()
         if (not self.current_menu == "settings"):
             self.menu_dict[self.current_menu].hide()
             self.current_menu = "settings"
             self.menu_dict["settings"].show()
 
     def show_help(self):
+        self.load_help()
         if (not self.current_menu == "help"):
             self.menu_dict[self.current_menu].hide()
             self.current_menu = "help"
@@ -892,4 +1365,6 @@ if __name__ == "__main__":
     main_window.setMinimumHeight(480)
     main_window.setMinimumWidth(720)
     main_window.show()
+    main_window.mark_startup("show")
+    QTimer.singleShot(0, main_window.report_startup)
     sys.exit(app.exec())
@@ -0,0 +1,332 @@
+# This Python file uses the following encoding: utf-8
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from collections import OrderedDict
+
+
+class TableModel(QAbstractTableModel):
+    """
+    read-only table model over a list of row tuples fetched by the database class;
+    rows can be inserted, updated and removed one at a time without resetting the model
+    """
+    def __init__(self, headers, rows=None):
+        QAbstractTableModel.__init__(self)
+        self.headers = headers
+        self.rows = rows if rows is not None else []
+
+    def rowCount(self, parent=None):
+        return len(self.rows)
+
+    def columnCount(self, parent=None):
+        return len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if (not index.isValid() or role != Qt.DisplayRole):
+            return None
+        return self.rows[index.row()][index.column()]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if (orientation == Qt.Horizontal and role == Qt.DisplayRole):
+            return self.headers[section]
+        return None
+
+    def find_row(self, key):
+        """
+        returns the position of the row whose first column is key, or None
+        """
+        for i in range(len(self.rows)):
+            if (self.rows[i][0] == key):
+                return i
+        return None
+
+    def insert_row(self, position, row):
+        self.beginInsertRows(QModelIndex(), position, position)
+        self.rows.insert(position, row)
+        self.endInsertRows()
+
+    def update_row(self, position, row):
+        self.rows[position] = row
+        self.dataChanged.emit(self.index(position, 0), self.index(position, len(self.headers) - 1))
+
+    def remove_row(self, position):
+        self.beginRemoveRows(QModelIndex(), position, position)
+        del self.rows[position]
+        self.endRemoveRows()
+
+    def set_row(self, key, row):
+        """
+        replaces the row whose first column is key with row, appending it if there's no such row;
+        if row is None, the row is removed instead
+        """
+        position = self.find_row(key)
+        if (row is None):
+            if (position is not None):
+                self.remove_row(position)
+        elif (position is None):
+            self.insert_row(len(self.rows), row)
+        else:
+            self.update_row(position, row)
+
+
+def sort_order(key):
+    """
+    orders sort keys the way SQLite does, with numbers before text
+    """
+    return tuple((isinstance(v, str), v) for v in key)
+
+
+class GameTableModel(TableModel):
+    """
+    one page of the game table; writes go through this model, which then
+    inserts, updates or removes just the rows they affect on the page
+    """
+    def __init__(self, db, headers, rows, keys):
+        TableModel.__init__(self, headers, rows)
+        self.db = db
+        self.keys = keys
+        self.page = db.get_current_page()
+
+    def add_item(self, item, genres=None, platforms=None):
+        """
+        adds a game through the database and places it on this page if it belongs here
+        """
+        rv = self.db.add_item(item, genres, platforms)
+        if (rv):
+            found = self.db.get_game_row(item["name"])
+            if (found is not None):
+                self.db.total_games += 1
+                self.place_game(found[0], found[1])
+        return rv
+
+    def edit_item(self, old_name, item, genres, platforms):
+        """
+        edits a game through the database, then updates its row in place,
+        or moves it on or off this page if its sort position changed
+        """
+        was_listed = self.db.get_game_row(old_name) is not None
+        rv = self.db.edit_item(old_name, item, genres, platforms)
+        if (not rv):
+            return rv
+
+        found = self.db.get_game_row(item["name"])
+        self.db.total_games += (found is not None) - was_listed
+        position = self.find_row(old_name)
+        if (position is not None and found is not None and self.keys[position] == found[1]):
+            # sort key didn't change, so the game keeps its place
+            self.update_row(position, found[0])
+            return rv
+        if (position is not None):
+            self.unplace_game(position)
+        if (found is not None):
+            self.place_game(found[0], found[1])
+        return rv
+
+    def delete_item(self, name):
+        """
+        deletes a game through the database and removes it from this page
+        """
+        return self.delete_items([name])
+
+    def delete_items(self, names):
+        """
+        deletes games through the database in one transaction and removes them from this page
+        """
+        rv = self.db.delete_items(names)
+        if (rv):
+            positions = [self.find_row(n) for n in names]
+            for position in sorted([p for p in positions if p is not None], reverse=True):
+                self.remove_row(position)
+                del self.keys[position]
+            self.fill_page()
+            self.db.total_games = self.db.count_games()
+        return rv
+
+    def page_start(self):
+        """
+        returns the sort key the page starts after, or None for the first page
+        """
+        if (self.page == 0 or len(self.db.page_keys) < self.page):
+            return None
+        return self.db.page_keys[self.page - 1]
+
+    def comes_before(self, a, b):
+        if (self.db.sort_descending):
+            return sort_order(a) > sort_order(b)
+        return sort_order(a) < sort_order(b)
+
+    def place_game(self, row, key):
+        """
+        inserts a game row where it belongs on this page, if it belongs here
+        """
+        start = self.page_start()
+        if (start is not None and not self.comes_before(start, key)):
+            # belongs on an earlier page, which doesn't change what this page holds
+            return
+        position = 0
+        while (position < len(self.keys) and self.comes_before(self.keys[position], key)):
+            position += 1
+        if (position == len(self.rows) and (self.db.next_page_exists or len(self.rows) >= self.db.items_per_page)):
+            # belongs on a later page
+            self.db.next_page_exists = True
+            return
+
+        self.insert_row(position, row)
+        self.keys.insert(position, key)
+        if (len(self.rows) > self.db.items_per_page):
+            # the last game gets pushed onto the next page
+            self.remove_row(len(self.rows) - 1)
+            del self.keys[-1]
+            self.db.next_page_exists = True
+        self.update_page_key()
+
+    def unplace_game(self, position):
+        """
+        removes a game row from this page, pulling the first game of the next page up to fill its place
+        """
+        self.remove_row(position)
+        del self.keys[position]
+        self.fill_page()
+
+    def fill_page(self):
+        """
+        fills the end of a page that's lost rows with the first games of the next page
+        """
+        missing = self.db.items_per_page - len(self.rows)
+        if (self.db.next_page_exists and missing > 0):
+            last = self.keys[-1] if len(self.keys) > 0 else self.page_start()
+            rows, keys = self.db.get_games_after(last, missing + 1)
+            for i in range(min(missing, len(rows))):
+                self.insert_row(len(self.rows), rows[i])
+                self.keys.append(keys[i])
+            self.db.next_page_exists = len(rows) > missing
+        self.update_page_key()
+
+    def update_page_key(self):
+        """
+        keeps the database's key for seeking past this page in sync with its last row
+        """
+        del self.db.page_keys[self.page:]
+        if (len(self.keys) > 0 and len(self.db.page_keys) == self.page):
+            self.db.page_keys.append(self.keys[-1])
+
+
+class ScrollingGameModel(QAbstractTableModel):
+    """
+    the whole game table for continuous scrolling, fetched a chunk of rows at a time as the view
+    scrolls down to them; only the most recently used chunks are kept, along with the sort key
+    each chunk ends on, so a chunk that was dropped can be fetched again by seeking past the one before it
+    """
+    def __init__(self, db, headers, chunk_size=100, max_chunks=10):
+        QAbstractTableModel.__init__(self)
+        self.db = db
+        self.headers = headers
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.load()
+
+    def load(self):
+        """
+        starts over from the first chunk
+        """
+        self.chunks = OrderedDict()
+        self.chunk_keys = []
+        self.num_rows = 0
+        self.exhausted = False
+        self.total = self.db.count_games()
+        self.num_rows = len(self.fetch_chunk())
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.num_rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if (not index.isValid() or role != Qt.DisplayRole):
+            return None
+        rows = self.get_chunk(index.row() // self.chunk_size)
+        position = index.row() % self.chunk_size
+        if (position >= len(rows)):
+            # the games changed since the chunk was first fetched
+            return None
+        return rows[position][index.column()]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if (orientation == Qt.Horizontal and role == Qt.DisplayRole):
+            return self.headers[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if (not self.canFetchMore(parent)):
+            return
+        rows = self.fetch_chunk()
+        if (len(rows) > 0):
+            self.beginInsertRows(QModelIndex(), self.num_rows, self.num_rows + len(rows) - 1)
+            self.num_rows += len(rows)
+            self.endInsertRows()
+
+    def fetch_chunk(self):
+        """
+        fetches the chunk after the last one, returning its rows; the caller counts them in num_rows
+        """
+        start = self.chunk_keys[-1] if len(self.chunk_keys) > 0 else None
+        rows, keys = self.db.get_games_after(start, self.chunk_size + 1)
+        # the extra row only tells us whether there's more to fetch
+        self.exhausted = len(rows) <= self.chunk_size
+        rows = rows[:self.chunk_size]
+        if (len(rows) > 0):
+            self.store_chunk(len(self.chunk_keys), rows)
+            self.chunk_keys.append(keys[len(rows) - 1])
+        return rows
+
+    def get_chunk(self, chunk):
+        """
+        returns the rows of the given chunk, fetching it again if it was dropped
+        """
+        if (chunk in self.chunks):
+            self.chunks.move_to_end(chunk)
+            return self.chunks[chunk]
+        start = self.chunk_keys[chunk - 1] if chunk > 0 else None
+        rows, keys = self.db.get_games_after(start, self.chunk_size)
+        self.store_chunk(chunk, rows)
+        return rows
+
+    def store_chunk(self, chunk, rows):
+        self.chunks[chunk] = rows
+        self.chunks.move_to_end(chunk)
+        if (len(self.chunks) > self.max_chunks):
+            self.chunks.popitem(last=False)
+
+    def reload(self):
+        """
+        fetches everything again after the games changed, as far down as had been fetched before
+        """
+        num_rows = self.num_rows
+        self.beginResetModel()
+        self.load()
+        while (not self.exhausted and self.num_rows < num_rows):
+            self.num_rows += len(self.fetch_chunk())
+        self.endResetModel()
+
+    def add_item(self, item, genres=None, platforms=None):
+        rv = self.db.add_item(item, genres, platforms)
+        if (rv):
+            self.reload()
+        return rv
+
+    def edit_item(self, old_name, item, genres, platforms):
+        rv = self.db.edit_item(old_name, item, genres, platforms)
+        if (rv):
+            self.reload()
+        return rv
+
+    def delete_item(self, name):
+        return self.delete_items([name])
+
+    def delete_items(self, names):
+        rv = self.db.delete_items(names)
+        if (rv):
+            self.reload()
+        return rv
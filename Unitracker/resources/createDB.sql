@@ -1,7 +1,77 @@
-CREATE TABLE IF NOT EXISTS game(name VARCHAR(25), progress INT(3) DEFAULT 0, hours_played NUMERIC(30) DEFAULT 0, start_date DATE, end_date DATE, total_achievements INT(20), completed_achievements INT(20), series_name VARCHAR(25), PRIMARY KEY(name), FOREIGN KEY(series_name) REFERENCES series(name) ON DELETE SET NULL, CHECK (hours_played >= 0 AND progress >= 0));
+CREATE TABLE IF NOT EXISTS game(id INTEGER PRIMARY KEY, name VARCHAR(25), progress INT(3) DEFAULT 0, hours_played NUMERIC(30) DEFAULT 0, start_date DATE, end_date DATE, total_achievements INT(20), completed_achievements INT(20), series_name VARCHAR(25), UNIQUE(name), FOREIGN KEY(series_name) REFERENCES series(name) ON DELETE SET NULL, CHECK (hours_played >= 0 AND progress >= 0));
 
-CREATE TABLE IF NOT EXISTS genre(game_name VARCHAR(25), name VARCHAR(20), FOREIGN KEY(game_name) REFERENCES game(name) ON DELETE CASCADE ON UPDATE CASCADE, PRIMARY KEY(game_name, name));
+CREATE TABLE IF NOT EXISTS genre_dict(id INTEGER PRIMARY KEY, name VARCHAR(20), UNIQUE(name));
 
-CREATE TABLE IF NOT EXISTS platform(game_name VARCHAR(25), name VARCHAR(20), FOREIGN KEY(game_name) REFERENCES game(name) ON DELETE CASCADE ON UPDATE CASCADE, PRIMARY KEY(game_name, name));
+CREATE TABLE IF NOT EXISTS game_genre(game_id INTEGER, genre_id INTEGER, FOREIGN KEY(game_id) REFERENCES game(id) ON DELETE CASCADE, FOREIGN KEY(genre_id) REFERENCES genre_dict(id), PRIMARY KEY(game_id, genre_id)) WITHOUT ROWID;
+
+CREATE VIEW IF NOT EXISTS genre(game_name, name) AS SELECT game.name, genre_dict.name FROM game_genre JOIN game ON (game.id == game_genre.game_id) JOIN genre_dict ON (genre_dict.id == game_genre.genre_id);
+
+CREATE TABLE IF NOT EXISTS platform_dict(id INTEGER PRIMARY KEY, name VARCHAR(20), UNIQUE(name));
+
+CREATE TABLE IF NOT EXISTS game_platform(game_id INTEGER, platform_id INTEGER, FOREIGN KEY(game_id) REFERENCES game(id) ON DELETE CASCADE, FOREIGN KEY(platform_id) REFERENCES platform_dict(id), PRIMARY KEY(game_id, platform_id)) WITHOUT ROWID;
+
+CREATE VIEW IF NOT EXISTS platform(game_name, name) AS SELECT game.name, platform_dict.name FROM game_platform JOIN game ON (game.id == game_platform.game_id) JOIN platform_dict ON (platform_dict.id == game_platform.platform_id);
 
 CREATE TABLE IF NOT EXISTS series(name VARCHAR(25), num_games INT(10) DEFAULT 0, total_playtime NUMERIC(30) DEFAULT 0, PRIMARY KEY(name));
+
+CREATE VIRTUAL TABLE IF NOT EXISTS game_search USING fts5(name, series_name, genres, platforms);
+
+CREATE INDEX IF NOT EXISTS game_progress ON game(ifnull(progress, -1), name);
+
+CREATE INDEX IF NOT EXISTS game_hours_played ON game(ifnull(hours_played, -1), name);
+
+CREATE INDEX IF NOT EXISTS game_start_date ON game(ifnull(start_date, ''), name);
+
+CREATE INDEX IF NOT EXISTS game_end_date ON game(ifnull(end_date, ''), name);
+
+CREATE INDEX IF NOT EXISTS game_total_achievements ON game(ifnull(total_achievements, -1), name);
+
+CREATE INDEX IF NOT EXISTS game_completed_achievements ON game(ifnull(completed_achievements, -1), name);
+
+CREATE INDEX IF NOT EXISTS game_series_name ON game(ifnull(series_name, ''), name);
+
+CREATE INDEX IF NOT EXISTS game_genre_tag ON game_genre(genre_id);
+
+CREATE INDEX IF NOT EXISTS game_platform_tag ON game_platform(platform_id);
+
+CREATE INDEX IF NOT EXISTS game_series ON game(series_name);
+
+CREATE TABLE IF NOT EXISTS game_tags(game_id INTEGER, genres TEXT, platforms TEXT, PRIMARY KEY(game_id));
+
+CREATE TRIGGER IF NOT EXISTS genre_insert_tags AFTER INSERT ON game_genre BEGIN INSERT OR IGNORE INTO game_tags (game_id) VALUES (NEW.game_id); UPDATE game_tags SET genres = (SELECT group_concat(name) FROM (SELECT genre_dict.name FROM game_genre JOIN genre_dict ON (genre_dict.id == game_genre.genre_id) WHERE game_id == NEW.game_id ORDER BY genre_dict.name)) WHERE game_id == NEW.game_id; END;
+
+CREATE TRIGGER IF NOT EXISTS genre_delete_tags AFTER DELETE ON game_genre BEGIN UPDATE game_tags SET genres = (SELECT group_concat(name) FROM (SELECT genre_dict.name FROM game_genre JOIN genre_dict ON (genre_dict.id == game_genre.genre_id) WHERE game_id == OLD.game_id ORDER BY genre_dict.name)) WHERE game_id == OLD.game_id; END;
+
+CREATE TRIGGER IF NOT EXISTS platform_insert_tags AFTER INSERT ON game_platform BEGIN INSERT OR IGNORE INTO game_tags (game_id) VALUES (NEW.game_id); UPDATE game_tags SET platforms = (SELECT group_concat(name) FROM (SELECT platform_dict.name FROM game_platform JOIN platform_dict ON (platform_dict.id == game_platform.platform_id) WHERE game_id == NEW.game_id ORDER BY platform_dict.name)) WHERE game_id == NEW.game_id; END;
+
+CREATE TRIGGER IF NOT EXISTS platform_delete_tags AFTER DELETE ON game_platform BEGIN UPDATE game_tags SET platforms = (SELECT group_concat(name) FROM (SELECT platform_dict.name FROM game_platform JOIN platform_dict ON (platform_dict.id == game_platform.platform_id) WHERE game_id == OLD.game_id ORDER BY platform_dict.name)) WHERE game_id == OLD.game_id; END;
+
+CREATE TRIGGER IF NOT EXISTS game_delete_tags AFTER DELETE ON game BEGIN DELETE FROM game_tags WHERE game_id == OLD.id; END;
+
+CREATE TRIGGER IF NOT EXISTS game_insert_series AFTER INSERT ON game WHEN NEW.series_name IS NOT NULL BEGIN INSERT OR IGNORE INTO series (name, num_games, total_playtime) VALUES (NEW.series_name, 0, 0); UPDATE series SET num_games = num_games + 1, total_playtime = total_playtime + ifnull(NEW.hours_played, 0) WHERE name == NEW.series_name; END;
+
+CREATE TRIGGER IF NOT EXISTS game_delete_series AFTER DELETE ON game WHEN OLD.series_name IS NOT NULL BEGIN UPDATE series SET num_games = num_games - 1, total_playtime = total_playtime - ifnull(OLD.hours_played, 0) WHERE name == OLD.series_name; DELETE FROM series WHERE name == OLD.series_name AND num_games < 1; END;
+
+CREATE TRIGGER IF NOT EXISTS game_update_series AFTER UPDATE OF series_name, hours_played ON game BEGIN UPDATE series SET num_games = num_games - 1, total_playtime = total_playtime - ifnull(OLD.hours_played, 0) WHERE name == OLD.series_name; DELETE FROM series WHERE name == OLD.series_name AND num_games < 1; INSERT OR IGNORE INTO series (name, num_games, total_playtime) SELECT NEW.series_name, 0, 0 WHERE NEW.series_name IS NOT NULL; UPDATE series SET num_games = num_games + 1, total_playtime = total_playtime + ifnull(NEW.hours_played, 0) WHERE name == NEW.series_name; END;
+
+CREATE TABLE IF NOT EXISTS library_stats(id INTEGER CHECK (id == 1), num_games INT(20) DEFAULT 0, total_hours NUMERIC(30) DEFAULT 0, total_progress INT(20) DEFAULT 0, completed_games INT(20) DEFAULT 0, total_achievements INT(20) DEFAULT 0, completed_achievements INT(20) DEFAULT 0, PRIMARY KEY(id));
+
+CREATE TABLE IF NOT EXISTS genre_stats(name VARCHAR(20), num_games INT(20) DEFAULT 0, total_hours NUMERIC(30) DEFAULT 0, PRIMARY KEY(name));
+
+CREATE TABLE IF NOT EXISTS platform_stats(name VARCHAR(20), num_games INT(20) DEFAULT 0, total_hours NUMERIC(30) DEFAULT 0, PRIMARY KEY(name));
+
+CREATE TABLE IF NOT EXISTS monthly_stats(month CHAR(7), num_games INT(20) DEFAULT 0, PRIMARY KEY(month));
+
+CREATE TRIGGER IF NOT EXISTS game_insert_stats AFTER INSERT ON game BEGIN INSERT OR IGNORE INTO library_stats (id) VALUES (1); UPDATE library_stats SET num_games = num_games + 1, total_hours = total_hours + ifnull(NEW.hours_played, 0), total_progress = total_progress + ifnull(NEW.progress, 0), completed_games = completed_games + (ifnull(NEW.progress, 0) >= 100), total_achievements = total_achievements + ifnull(NEW.total_achievements, 0), completed_achievements = completed_achievements + ifnull(NEW.completed_achievements, 0) WHERE id == 1; INSERT OR IGNORE INTO monthly_stats (month, num_games) SELECT CASE WHEN NEW.end_date <> '' THEN ifnull(strftime('%Y-%m', NEW.end_date), 'Unknown') END, 0 WHERE CASE WHEN NEW.end_date <> '' THEN ifnull(strftime('%Y-%m', NEW.end_date), 'Unknown') END IS NOT NULL; UPDATE monthly_stats SET num_games = num_games + 1 WHERE month == CASE WHEN NEW.end_date <> '' THEN ifnull(strftime('%Y-%m', NEW.end_date), 'Unknown') END; END;
+
+CREATE TRIGGER IF NOT EXISTS game_delete_stats AFTER DELETE ON game BEGIN UPDATE library_stats SET num_games = num_games - 1, total_hours = total_hours - ifnull(OLD.hours_played, 0), total_progress = total_progress - ifnull(OLD.progress, 0), completed_games = completed_games - (ifnull(OLD.progress, 0) >= 100), total_achievements = total_achievements - ifnull(OLD.total_achievements, 0), completed_achievements = completed_achievements - ifnull(OLD.completed_achievements, 0) WHERE id == 1; UPDATE monthly_stats SET num_games = num_games - 1 WHERE month == CASE WHEN OLD.end_date <> '' THEN ifnull(strftime('%Y-%m', OLD.end_date), 'Unknown') END; DELETE FROM monthly_stats WHERE month == CASE WHEN OLD.end_date <> '' THEN ifnull(strftime('%Y-%m', OLD.end_date), 'Unknown') END AND num_games < 1; END;
+
+CREATE TRIGGER IF NOT EXISTS game_update_stats AFTER UPDATE OF progress, hours_played, end_date, total_achievements, completed_achievements ON game BEGIN UPDATE library_stats SET total_hours = total_hours - ifnull(OLD.hours_played, 0) + ifnull(NEW.hours_played, 0), total_progress = total_progress - ifnull(OLD.progress, 0) + ifnull(NEW.progress, 0), completed_games = completed_games - (ifnull(OLD.progress, 0) >= 100) + (ifnull(NEW.progress, 0) >= 100), total_achievements = total_achievements - ifnull(OLD.total_achievements, 0) + ifnull(NEW.total_achievements, 0), completed_achievements = completed_achievements - ifnull(OLD.completed_achievements, 0) + ifnull(NEW.completed_achievements, 0) WHERE id == 1; UPDATE genre_stats SET total_hours = total_hours - ifnull(OLD.hours_played, 0) + ifnull(NEW.hours_played, 0) WHERE name IN (SELECT genre_dict.name FROM game_genre JOIN genre_dict ON (genre_dict.id == game_genre.genre_id) WHERE game_id == NEW.id); UPDATE platform_stats SET total_hours = total_hours - ifnull(OLD.hours_played, 0) + ifnull(NEW.hours_played, 0) WHERE name IN (SELECT platform_dict.name FROM game_platform JOIN platform_dict ON (platform_dict.id == game_platform.platform_id) WHERE game_id == NEW.id); UPDATE monthly_stats SET num_games = num_games - 1 WHERE month == CASE WHEN OLD.end_date <> '' THEN ifnull(strftime('%Y-%m', OLD.end_date), 'Unknown') END; DELETE FROM monthly_stats WHERE month == CASE WHEN OLD.end_date <> '' THEN ifnull(strftime('%Y-%m', OLD.end_date), 'Unknown') END AND num_games < 1; INSERT OR IGNORE INTO monthly_stats (month, num_games) SELECT CASE WHEN NEW.end_date <> '' THEN ifnull(strftime('%Y-%m', NEW.end_date), 'Unknown') END, 0 WHERE CASE WHEN NEW.end_date <> '' THEN ifnull(strftime('%Y-%m', NEW.end_date), 'Unknown') END IS NOT NULL; UPDATE monthly_stats SET num_games = num_games + 1 WHERE month == CASE WHEN NEW.end_date <> '' THEN ifnull(strftime('%Y-%m', NEW.end_date), 'Unknown') END; END;
+
+CREATE TRIGGER IF NOT EXISTS genre_insert_stats AFTER INSERT ON game_genre BEGIN INSERT OR IGNORE INTO genre_stats (name, num_games, total_hours) SELECT name, 0, 0 FROM genre_dict WHERE id == NEW.genre_id; UPDATE genre_stats SET num_games = num_games + 1, total_hours = total_hours + ifnull((SELECT hours_played FROM game WHERE id == NEW.game_id), 0) WHERE name == (SELECT name FROM genre_dict WHERE id == NEW.genre_id); END;
+
+CREATE TRIGGER IF NOT EXISTS genre_delete_stats AFTER DELETE ON game_genre BEGIN UPDATE genre_stats SET num_games = num_games - 1, total_hours = total_hours - ifnull((SELECT hours_played FROM game WHERE id == OLD.game_id), 0) WHERE name == (SELECT name FROM genre_dict WHERE id == OLD.genre_id); DELETE FROM genre_stats WHERE name == (SELECT name FROM genre_dict WHERE id == OLD.genre_id) AND num_games < 1; END;
+
+CREATE TRIGGER IF NOT EXISTS platform_insert_stats AFTER INSERT ON game_platform BEGIN INSERT OR IGNORE INTO platform_stats (name, num_games, total_hours) SELECT name, 0, 0 FROM platform_dict WHERE id == NEW.platform_id; UPDATE platform_stats SET num_games = num_games + 1, total_hours = total_hours + ifnull((SELECT hours_played FROM game WHERE id == NEW.game_id), 0) WHERE name == (SELECT name FROM platform_dict WHERE id == NEW.platform_id); END;
+
+CREATE TRIGGER IF NOT EXISTS platform_delete_stats AFTER DELETE ON game_platform BEGIN UPDATE platform_stats SET num_games = num_games - 1, total_hours = total_hours - ifnull((SELECT hours_played FROM game WHERE id == OLD.game_id), 0) WHERE name == (SELECT name FROM platform_dict WHERE id == OLD.platform_id); DELETE FROM platform_stats WHERE name == (SELECT name FROM platform_dict WHERE id == OLD.platform_id) AND num_games < 1; END;
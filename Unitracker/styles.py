@@ -0,0 +1,115 @@
+# This Python file uses the following encoding: utf-8
+import os
+import re
+import json
+import time
+import darkdetect
+import qdarktheme
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QGuiApplication
+
+
+class StylesheetCache:
+    """
+    the app's full stylesheets (qdarktheme's theme plus the app's own qss), built once per
+    (theme, text size) and kept in a json file so later launches don't have to build them again
+    """
+    def __init__(self, filename, app_qss, version=1):
+        """
+        filename: json file the stylesheets are saved in
+        app_qss: function (theme, text size) -> the app's qss, added after the theme's
+        version: bump whenever app_qss changes, so stylesheets saved by older versions are rebuilt
+        """
+        self.filename = filename
+        self.app_qss = app_qss
+        # saved stylesheets only match the qdarktheme version that built them
+        self.version = str(version) + "/" + qdarktheme.__version__
+        self.sheets = {}
+        # stylesheets known to be usable this run; saved ones are checked the first time they're used
+        self.checked = set()
+        self.hits = 0
+        self.misses = 0
+        self.build_seconds = 0
+        self.apply_seconds = 0
+        self.load()
+
+    def load(self):
+        """
+        reads the saved stylesheets, skipping them if they're from another version or unreadable
+        """
+        try:
+            with open(self.filename) as f:
+                saved = json.load(f)
+            if (saved.get("version") == self.version):
+                self.sheets = saved["sheets"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            self.sheets = {}
+
+    def save(self):
+        try:
+            with open(self.filename, 'w') as f:
+                json.dump({"version": self.version, "sheets": self.sheets}, f)
+        except OSError:
+            pass
+
+    def resolve(self, theme):
+        """
+        returns "light" or "dark" for a theme, looking up the system's theme for "auto":
+        Qt's color scheme if it knows it, otherwise darkdetect's
+        """
+        if (theme == "auto"):
+            scheme = QGuiApplication.styleHints().colorScheme()
+            if (scheme == Qt.ColorScheme.Dark):
+                return "dark"
+            if (scheme == Qt.ColorScheme.Light):
+                return "light"
+            system = darkdetect.theme()
+            return system.lower() if system is not None else "dark"
+        return theme
+
+    def icons_exist(self, sheet):
+        """
+        checks that the icon files a saved stylesheet points to are still in qdarktheme's cache
+        """
+        for path in re.findall(r"url\(([^)]*)\)", sheet):
+            if (not os.path.exists(path.strip("\"'"))):
+                return False
+        return True
+
+    def get(self, theme, text_size):
+        """
+        returns the stylesheet for a theme ("light" or "dark") and text size, building it if needed
+        """
+        key = theme + "/" + str(text_size)
+        sheet = self.sheets.get(key)
+        if (sheet is not None and (key in self.checked or self.icons_exist(sheet))):
+            self.checked.add(key)
+            self.hits += 1
+            return sheet
+
+        self.misses += 1
+        start = time.perf_counter()
+        sheet = qdarktheme.load_stylesheet(theme) + self.app_qss(theme, text_size)
+        self.build_seconds += time.perf_counter() - start
+        self.sheets[key] = sheet
+        self.checked.add(key)
+        self.save()
+        return sheet
+
+    def apply(self, app, theme, text_size):
+        """
+        styles the whole app with the stylesheet and palette for a theme and text size
+        """
+        theme = self.resolve(theme)
+        sheet = self.get(theme, text_size)
+        start = time.perf_counter()
+        app.setStyleSheet(sheet)
+        app.setPalette(qdarktheme.load_palette(theme, for_stylesheet=True))
+        self.apply_seconds += time.perf_counter() - start
+
+    def get_stats(self):
+        """
+        returns how often stylesheets came from the cache, and how long building and applying them took
+        """
+        return {"hits": self.hits, "misses": self.misses,
+                "build_seconds": self.build_seconds, "apply_seconds": self.apply_seconds}
@@ -0,0 +1,141 @@
+# This Python file uses the following encoding: utf-8
+import time
+from PySide6.QtCore import QObject, QRunnable, Signal, Slot
+from PySide6.QtSql import QSqlDatabase
+from database import database
+
+
+class TransferSignals(QObject):
+    """
+    signals a TransferJob sends back to the GUI thread
+    """
+    # rows done, total rows, rows per second
+    progress = Signal(int, int, float)
+    # succeeded, cancelled, rows done, rows per second
+    finished = Signal(bool, bool, int, float)
+
+
+class TransferJob(QRunnable):
+    """
+    imports or exports the database on a thread pool thread, through a connection of its own;
+    a cancelled import is rolled back and a cancelled export leaves no file behind
+    """
+    jobs_started = 0
+
+    def __init__(self, files_path, kind, filename, storage):
+        """
+        kind: "import" or "export"
+        filename: file to import from or export to; .sqlite, .json or .jsonl
+        storage: storage settings for the job's connection, like the main connection's
+        """
+        QRunnable.__init__(self)
+        # the window keeps the job until it's finished, so Qt mustn't delete it
+        self.setAutoDelete(False)
+        self.files_path = files_path
+        self.kind = kind
+        self.filename = filename
+        self.storage = storage
+        self.signals = TransferSignals()
+        self.cancelled = False
+        self.rows = 0
+        self.start_time = 0
+        # qt connections are per thread, so every job gets its own name
+        TransferJob.jobs_started += 1
+        self.connection = "transfer" + str(TransferJob.jobs_started)
+
+    def cancel(self):
+        """
+        asks the job to stop at its next progress update; safe to call from the GUI thread
+        """
+        self.cancelled = True
+
+    def rows_per_second(self):
+        seconds = time.perf_counter() - self.start_time
+        return self.rows/seconds if seconds > 0 else 0
+
+    def report(self, done, total):
+        """
+        progress callback for the database's import/export functions
+        """
+        self.rows = done
+        self.signals.progress.emit(done, total, self.rows_per_second())
+        return self.cancelled
+
+    def run(self):
+        self.start_time = time.perf_counter()
+        db = database(self.files_path, self.connection)
+        rv = db.db.open() and db.set_storage(self.storage)
+        try:
+            rv = rv and self.transfer(db)
+        except OSError:
+            rv = False
+        db.close()
+        del db
+        QSqlDatabase.removeDatabase(self.connection)
+        self.signals.finished.emit(bool(rv), self.cancelled and not rv, self.rows, self.rows_per_second())
+
+    def transfer(self, db):
+        """
+        runs the import or export for the file's format
+        """
+        sqlite = self.filename.endswith(".sqlite")
+        if (self.kind == "import"):
+            if (sqlite):
+                return db.import_db(self.filename, self.report)
+            return db.import_json(self.filename, self.report)
+        if (sqlite):
+            return db.export_db(self.filename)
+        return db.export_json(self.filename, self.report)
+
+
+class PrefetchWorker(QObject):
+    """
+    fetches the game pages around the one being shown ahead of time, on a thread and
+    connection of its own (see database.prefetch_pages); moved to a QThread by the window,
+    it gets requests through the requested signal and sends the pages back through fetched
+    """
+    # page state, pages after, pages before
+    requested = Signal(object, object, object)
+    # list of (page cache key, page cache entry)
+    fetched = Signal(object)
+    stopping = Signal()
+
+    def __init__(self, files_path, storage):
+        QObject.__init__(self)
+        self.files_path = files_path
+        self.storage = storage
+        self.db = None
+        # only the newest request is worth running, older ones are for pages the user has left
+        self.latest = 0
+        self.requested.connect(self.prefetch)
+
+    def request(self, state, forward, backward):
+        """
+        asks for pages to be prefetched; called from the GUI thread
+        """
+        self.latest += 1
+        state["request"] = self.latest
+        self.requested.emit(state, forward, backward)
+
+    @Slot(object, object, object)
+    def prefetch(self, state, forward, backward):
+        if (state.pop("request") != self.latest):
+            return
+        if (self.db is None):
+            # qt connections belong to the thread that made them, so it's made here
+            self.db = database(self.files_path, "prefetch")
+            if (not self.db.db.open()):
+                self.db = None
+                return
+            self.db.set_storage(self.storage)
+        self.fetched.emit(self.db.prefetch_pages(state, forward, backward))
+
+    @Slot()
+    def close(self):
+        """
+        closes the worker's connection; has to run on the worker's thread
+        """
+        if (self.db is not None):
+            self.db.close()
+            self.db = None
+            QSqlDatabase.removeDatabase("prefetch")